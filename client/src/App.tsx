@@ -1,6 +1,7 @@
 import { Toaster } from "@/components/ui/sonner";
 import { TooltipProvider } from "@/components/ui/tooltip";
 import NotFound from "@/pages/NotFound";
+import { lazy, Suspense } from "react";
 import { Route, Switch } from "wouter";
 import ErrorBoundary from "./components/ErrorBoundary";
 import { ThemeProvider } from "./contexts/ThemeContext";
@@ -8,12 +9,14 @@ import Login from "./pages/Login";
 import AuthCallback from "./pages/AuthCallback";
 import { EditorialLayout } from "@/components/chrome/EditorialLayout";
 import { Brief } from "@/pages/editorial/Brief";
-import Jobs from "@/pages/editorial/Jobs";
-import Companies from "@/pages/editorial/Companies";
-import Agents from "@/pages/editorial/Agents";
-import AgentChat from "@/pages/editorial/AgentChat";
-import Profile from "@/pages/editorial/Profile";
-import Bulletins from "@/pages/editorial/Bulletins";
+
+// Brief on etusivu ja ladataan heti; muut osiot ladataan vasta kun niihin navigoidaan
+const Jobs = lazy(() => import("@/pages/editorial/Jobs"));
+const Companies = lazy(() => import("@/pages/editorial/Companies"));
+const Agents = lazy(() => import("@/pages/editorial/Agents"));
+const AgentChat = lazy(() => import("@/pages/editorial/AgentChat"));
+const Profile = lazy(() => import("@/pages/editorial/Profile"));
+const Bulletins = lazy(() => import("@/pages/editorial/Bulletins"));
 
 function Router() {
   return (
@@ -23,22 +26,24 @@ function Router() {
       <Route>
         {() => (
           <EditorialLayout>
-            <Switch>
-              <Route path="/" component={Brief} />
-              <Route path="/jobs/saved" component={Jobs} />
-              <Route path="/jobs/matches" component={Jobs} />
-              <Route path="/jobs" component={Jobs} />
-              <Route path="/companies/discover" component={Companies} />
-              <Route path="/companies/prh" component={Companies} />
-              <Route path="/companies" component={Companies} />
-              <Route path="/agents/:id" component={AgentChat} />
-              <Route path="/agents" component={Agents} />
-              <Route path="/profile" component={Profile} />
-              <Route path="/bulletins/unread" component={Bulletins} />
-              <Route path="/bulletins/archived" component={Bulletins} />
-              <Route path="/bulletins" component={Bulletins} />
-              <Route component={NotFound} />
-            </Switch>
+            <Suspense fallback={null}>
+              <Switch>
+                <Route path="/" component={Brief} />
+                <Route path="/jobs/saved" component={Jobs} />
+                <Route path="/jobs/matches" component={Jobs} />
+                <Route path="/jobs" component={Jobs} />
+                <Route path="/companies/discover" component={Companies} />
+                <Route path="/companies/prh" component={Companies} />
+                <Route path="/companies" component={Companies} />
+                <Route path="/agents/:id" component={AgentChat} />
+                <Route path="/agents" component={Agents} />
+                <Route path="/profile" component={Profile} />
+                <Route path="/bulletins/unread" component={Bulletins} />
+                <Route path="/bulletins/archived" component={Bulletins} />
+                <Route path="/bulletins" component={Bulletins} />
+                <Route component={NotFound} />
+              </Switch>
+            </Suspense>
           </EditorialLayout>
         )}
       </Route>
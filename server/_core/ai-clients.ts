@@ -0,0 +1,31 @@
+/**
+ * Jaetut AI-clientit: yksi OpenAI- ja yksi Anthropic-client prosessia kohden.
+ *
+ * Clientit luodaan laiskasti ensimmäisellä käytöllä (moduulin import ei lataa SDK:ta
+ * eikä kaadu puuttuvaan avaimeen). Samanaikaiset kutsut jakavat saman lupauksen;
+ * epäonnistunut luonti nollataan, jotta seuraava kutsu yrittää uudelleen.
+ */
+import { ENV } from "./env";
+
+export function lazyClient<T>(create: () => Promise<T>): () => Promise<T> {
+  let client: Promise<T> | null = null;
+  return () => {
+    if (!client) {
+      client = create().catch((err) => {
+        client = null;
+        throw err;
+      });
+    }
+    return client;
+  };
+}
+
+export const getOpenAIClient = lazyClient(async () => {
+  const { default: OpenAI } = await import("openai");
+  return new OpenAI({ apiKey: ENV.openaiApiKey || undefined });
+});
+
+export const getAnthropicClient = lazyClient(async () => {
+  const { default: Anthropic } = await import("@anthropic-ai/sdk");
+  return new Anthropic({ apiKey: ENV.anthropicApiKey || undefined });
+});
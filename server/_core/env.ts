@@ -2,6 +2,8 @@ export const ENV = {
   appId: process.env.VITE_APP_ID ?? "",
   cookieSecret: process.env.JWT_SECRET ?? "",
   databaseUrl: process.env.DATABASE_URL ?? "",
+  // MySQL-yhteyspoolin koko (oletus 10)
+  dbPoolSize: Number(process.env.DB_POOL_SIZE) || 10,
   oAuthServerUrl: process.env.OAUTH_SERVER_URL ?? "",
   ownerOpenId: process.env.OWNER_OPEN_ID ?? "",
   isProduction: process.env.NODE_ENV === "production",
@@ -11,4 +13,6 @@ export const ENV = {
   googleClientId: process.env.GOOGLE_CLIENT_ID ?? "",
   // OpenAI
   openaiApiKey: process.env.OPENAI_API_KEY ?? "",
+  // Anthropic
+  anthropicApiKey: process.env.ANTHROPIC_API_KEY ?? "",
 };
@@ -4,46 +4,63 @@
  */
 
 import type { UserContext, ProfileContext, JobContext, MatchContext, CompanyContext, EventContext } from "./types";
+import { TtlCache } from "../ttl-cache";
 
-export async function buildUserContext(userId: number): Promise<UserContext> {
-  const { 
-    getProfileByUserId, 
-    getSavedJobsByUserId, 
-    getMatchesByUserId,
-    getTopCompanyScores,
-    getEventsByCompanyId 
-  } = await import("../db");
+// Lyhytikäinen välimuisti: agenttikierros ja sen työkalut rakentavat saman käyttäjän
+// kontekstin useasti peräkkäin. Promise tallennetaan, joten samanaikaiset kutsut jakavat haun.
+const CONTEXT_CACHE_TTL_MS = 30 * 1000;
+const CONTEXT_CACHE_MAX_ENTRIES = 1024;
+const contextCache = new TtlCache<number, Promise<UserContext>>(CONTEXT_CACHE_TTL_MS, CONTEXT_CACHE_MAX_ENTRIES);
 
-  // Fetch data with error handling
-  let profile = null;
-  let savedJobsRaw: any[] = [];
-  let matchesRaw: any[] = [];
-  let companyScoresRaw: any[] = [];
+export function buildUserContext(userId: number): Promise<UserContext> {
+  const cached = contextCache.get(userId);
+  if (cached) return cached;
 
-  try {
-    profile = await getProfileByUserId(userId);
-  } catch (e) {
-    console.error("[Context] Error fetching profile:", e);
-  }
+  const value = loadUserContext(userId);
+  contextCache.set(userId, value);
+  value.catch(() => {
+    if (contextCache.get(userId) === value) contextCache.delete(userId);
+  });
+  return value;
+}
 
-  try {
-    savedJobsRaw = await getSavedJobsByUserId(userId) || [];
-  } catch (e) {
-    console.error("[Context] Error fetching saved jobs:", e);
-  }
+/**
+ * Poistaa käyttäjän kontekstin välimuistista. Kutsutaan kirjoitusten jälkeen
+ * (profiili, tallennetut työpaikat, matchit, yrityspisteet).
+ */
+export function invalidateUserContext(userId: number): void {
+  contextCache.delete(userId);
+}
 
-  try {
-    matchesRaw = await getMatchesByUserId(userId, 20) || [];
-  } catch (e) {
-    console.error("[Context] Error fetching matches:", e);
-  }
+async function loadUserContext(userId: number): Promise<UserContext> {
+  const { 
+    getProfileByUserId, 
+    getSavedJobSummariesByUserId, 
+    getMatchSummariesByUserId,
+    getTopCompanyScores,
+    getEventsByCompanyIds 
+  } = await import("../db");
 
-  try {
-    companyScoresRaw = await getTopCompanyScores(userId, 10) || [];
-  } catch (e) {
-    console.error("[Context] Error fetching company scores:", e);
+  // Fetch data with error handling — kyselyt ovat toisistaan riippumattomia, joten ne ajetaan rinnakkain
+  const [profile, savedJobsRaw, matchesRaw, companyScoresRaw] = await Promise.all([
+    getProfileByUserId(userId).catch(e => {
+      console.error("[Context] Error fetching profile:", e);
+      return null;
+    }),
+    getSavedJobSummariesByUserId(userId).then(r => (r || []) as any[]).catch(e => {
+      console.error("[Context] Error fetching saved jobs:", e);
+      return [] as any[];
+    }),
+    getMatchSummariesByUserId(userId, 20).then(r => (r || []) as any[]).catch(e => {
+      console.error("[Context] Error fetching matches:", e);
+      return [] as any[];
+    }),
     // This is expected to fail if tables don't exist yet
-  }
+    getTopCompanyScores(userId, 10).then(r => (r || []) as any[]).catch(e => {
+      console.error("[Context] Error fetching company scores:", e);
+      return [] as any[];
+    }),
+  ]);
 
   // Transform profile
   const profileContext: ProfileContext | null = profile ? {
@@ -92,13 +109,22 @@ export async function buildUserContext(userId: number): Promise<UserContext> {
     matchCategory: m.matchCategory,
   }));
 
-  // Transform company scores with events
+  // Transform company scores with events (yksi kysely kaikille yrityksille)
+  const companyIds = companyScoresRaw.map((cs: any) => cs.company?.id || cs.companyId);
+  let eventsByCompany = new Map<number, any[]>();
+  try {
+    eventsByCompany = await getEventsByCompanyIds(companyIds, 5);
+  } catch (e) {
+    console.error("[Context] Error fetching company events:", e);
+  }
+
   const recentCompanies: CompanyContext[] = [];
   for (const cs of companyScoresRaw) {
     try {
-      const events = await getEventsByCompanyId(cs.company?.id || cs.companyId, 5);
+      const companyId = cs.company?.id || cs.companyId;
+      const events = eventsByCompany.get(companyId) || [];
       recentCompanies.push({
-        id: cs.company?.id || cs.companyId,
+        id: companyId,
         name: cs.company?.name || cs.companyName || "Unknown",
         industry: cs.company?.industry || cs.industry,
         talentNeedScore: cs.score?.talentNeedScore || cs.talentNeedScore,
@@ -119,16 +145,46 @@ export async function buildUserContext(userId: number): Promise<UserContext> {
     }
   }
 
-  return {
+  return freezeContext({
     userId,
     profile: profileContext,
     savedJobs,
     topMatches,
     recentCompanies,
-  };
+  });
 }
 
+/**
+ * Välimuistin konteksti jaetaan kaikkien saman käyttäjän kutsujen kesken, joten se jäädytetään
+ * rekursiivisesti (myös profiilin taulukot ja listojen sisäkkäiset taulukot): vahingossa tehty
+ * muutos heittää virheen sen sijaan että vuotaisi muiden ajojen kontekstiin
+ */
+function freezeContext(context: UserContext): UserContext {
+  return deepFreeze(context);
+}
+
+function deepFreeze<T>(value: T): T {
+  if (value === null || typeof value !== "object" || Object.isFrozen(value)) return value;
+  // Date-olioiden sisäistä tilaa freeze ei suojaa, joten niitä ei käydä läpi
+  if (value instanceof Date) return value;
+  for (const child of Object.values(value as object)) deepFreeze(child);
+  return Object.freeze(value);
+}
+
+// Muotoiltu prompt-teksti per konteksti-olio: sama konteksti (esim. välimuistista)
+// muotoillaan vain kerran, ja merkintä vapautuu kun konteksti-olio kerätään roskiin
+const formattedPromptCache = new WeakMap<UserContext, string>();
+
 export function formatContextForPrompt(context: UserContext): string {
+  const cached = formattedPromptCache.get(context);
+  if (cached !== undefined) return cached;
+
+  const formatted = buildContextPrompt(context);
+  formattedPromptCache.set(context, formatted);
+  return formatted;
+}
+
+function buildContextPrompt(context: UserContext): string {
   const parts: string[] = [];
 
   // Profile summary
@@ -194,6 +250,8 @@ export function formatContextForPrompt(context: UserContext): string {
 function safeParseArray(value: any): any[] {
   if (!value) return [];
   if (Array.isArray(value)) return value;
+  // Nopea polku: jos arvo ei ala '['-merkillä se ei voi olla JSON-taulukko - ei poikkeusta
+  if (typeof value !== "string" || value.trimStart().charCodeAt(0) !== 91 /* [ */) return [];
   try {
     const parsed = JSON.parse(value);
     return Array.isArray(parsed) ? parsed : [];
@@ -6,8 +6,8 @@
  * Integrated with Message Bus for inter-agent communication.
  */
 
-import OpenAI from "openai";
-import type { AgentType, ChatRequest, ChatResponse, Message, UserContext, ToolCall, ToolResult } from "./types";
+import type OpenAI from "openai";
+import type { AgentType, AgentTool, ChatRequest, ChatResponse, Message, UserContext, ToolCall, ToolResult } from "./types";
 import { AGENTS } from "./types";
 import { buildUserContext, formatContextForPrompt } from "./context";
 import { getToolsForAgent, ALL_TOOLS } from "./tools";
@@ -19,10 +19,7 @@ import {
   AgentMessenger,
   type RunContext
 } from "./core";
-
-const openai = new OpenAI({
-  apiKey: process.env.OPENAI_API_KEY,
-});
+import { getOpenAIClient } from "../_core/ai-clients";
 
 // System prompts for each agent
 const AGENT_PROMPTS: Record<AgentType, string> = {
@@ -647,6 +644,30 @@ function formatToolsForOpenAI(tools: any[]): OpenAI.ChatCompletionTool[] {
   }));
 }
 
+// Agenttikohtaiset OpenAI-työkalumäärittelyt ovat staattisia - muotoillaan kerran ja käytetään uudelleen
+const openaiToolsCache = new Map<AgentType, OpenAI.ChatCompletionTool[]>();
+
+function getOpenAIToolsForAgent(agentType: AgentType): OpenAI.ChatCompletionTool[] {
+  let cached = openaiToolsCache.get(agentType);
+  if (!cached) {
+    cached = formatToolsForOpenAI(getToolsForAgent(agentType));
+    openaiToolsCache.set(agentType, cached);
+  }
+  return cached;
+}
+
+// Työkalujen dispatch-taulu nimen perusteella (O(1) haku tool-kutsuille)
+const toolMapCache = new Map<AgentType, Map<string, AgentTool>>();
+
+function getToolMapForAgent(agentType: AgentType): Map<string, AgentTool> {
+  let toolMap = toolMapCache.get(agentType);
+  if (!toolMap) {
+    toolMap = new Map(getToolsForAgent(agentType).map(t => [t.name, t]));
+    toolMapCache.set(agentType, toolMap);
+  }
+  return toolMap;
+}
+
 export async function chat(
   request: ChatRequest,
   userId: number
@@ -689,12 +710,12 @@ export async function chat(
   console.log(`[Agent] Started run ${runCtx.runId} for agent ${request.agentType}`);
 
   // Build context
-  const userContext = await buildUserContext(userId);
+  const baseContext = await buildUserContext(userId);
+  const contextPrompt = formatContextForPrompt(baseContext);
 
   // Attach runId to context so tools can access it
-  (userContext as any)._runId = runCtx.runId;
-
-  const contextPrompt = formatContextForPrompt(userContext);
+  // (välimuistin konteksti on jaettu, joten runId liitetään ajokohtaiseen kopioon)
+  const userContext = { ...baseContext, _runId: runCtx.runId } as UserContext;
 
   // Get shared knowledge context from previous interactions
   const sharedKnowledgeContext = SharedKnowledge.buildContextSummary(runCtx.runId);
@@ -703,8 +724,8 @@ export async function chat(
   const history = await getMessagesByConversationId(conversationId!, 20);
 
   // Get tools for this agent
-  const tools = getToolsForAgent(request.agentType);
-  const openaiTools = formatToolsForOpenAI(tools);
+  const toolMap = getToolMapForAgent(request.agentType);
+  const openaiTools = getOpenAIToolsForAgent(request.agentType);
 
   // Build system prompt with shared knowledge
   const systemPrompt = `${AGENT_PROMPTS[request.agentType]}
@@ -759,6 +780,7 @@ OHJEET:
   messages.push({ role: "user", content: userMessageContent });
 
   // Call OpenAI
+  const openai = await getOpenAIClient();
   let response = await openai.chat.completions.create({
     model: "gpt-4o",
     max_tokens: 4096,
@@ -785,7 +807,7 @@ OHJEET:
     for (const toolCall of calls) {
       const toolName = toolCall.function.name;
       const toolInput = JSON.parse(toolCall.function.arguments || "{}");
-      const tool = tools.find(t => t.name === toolName);
+      const tool = toolMap.get(toolName);
       let result: any = { error: "Tool not found" };
 
       if (tool) {
@@ -869,41 +891,42 @@ OHJEET:
   } as ChatResponse;
 }
 
+// Jatkokysymykset agenttityypeittäin - moduulitason taulukko, ei rakenneta uudelleen joka vastauksella
+const AGENT_FOLLOW_UPS: Readonly<Record<AgentType, readonly string[]>> = Object.freeze({
+  career_coach: [
+    "Mitä taitoja minun kannattaisi kehittää?",
+    "Miten voisin parantaa CV:täni?",
+    "Mikä olisi seuraava askel urassani?",
+  ],
+  job_analyzer: [
+    "Vertaile tätä muihin tallentamiini työpaikkoihin",
+    "Mitä taitoja minulta puuttuu tähän?",
+    "Onko tässä red flageja?",
+  ],
+  company_intel: [
+    "Mitä muita yrityksiä suosittelisit?",
+    "Millainen on yrityksen kasvuennuste?",
+    "Ketkä ovat heidän kilpailijoita?",
+  ],
+  interview_prep: [
+    "Generoi lisää teknisiä kysymyksiä",
+    "Miten vastaan 'Miksi haluat tänne?'",
+    "Harjoitellaan STAR-metodia",
+  ],
+  negotiator: [
+    "Mikä on realistinen palkkahaarukka?",
+    "Miten perustelen korkeampaa palkkaa?",
+    "Mitä etuja kannattaa neuvotella?",
+  ],
+  signal_scout: [
+    "Analysoi toinen yritys",
+    "Mitkä signaalit ovat vahvimpia?",
+    "Milloin minun kannattaisi ottaa yhteyttä?",
+  ],
+});
+
 function generateFollowUps(agentType: AgentType, lastMessage: string): string[] {
-  const followUps: Record<AgentType, string[]> = {
-    career_coach: [
-      "Mitä taitoja minun kannattaisi kehittää?",
-      "Miten voisin parantaa CV:täni?",
-      "Mikä olisi seuraava askel urassani?",
-    ],
-    job_analyzer: [
-      "Vertaile tätä muihin tallentamiini työpaikkoihin",
-      "Mitä taitoja minulta puuttuu tähän?",
-      "Onko tässä red flageja?",
-    ],
-    company_intel: [
-      "Mitä muita yrityksiä suosittelisit?",
-      "Millainen on yrityksen kasvuennuste?",
-      "Ketkä ovat heidän kilpailijoita?",
-    ],
-    interview_prep: [
-      "Generoi lisää teknisiä kysymyksiä",
-      "Miten vastaan 'Miksi haluat tänne?'",
-      "Harjoitellaan STAR-metodia",
-    ],
-    negotiator: [
-      "Mikä on realistinen palkkahaarukka?",
-      "Miten perustelen korkeampaa palkkaa?",
-      "Mitä etuja kannattaa neuvotella?",
-    ],
-    signal_scout: [
-      "Analysoi toinen yritys",
-      "Mitkä signaalit ovat vahvimpia?",
-      "Milloin minun kannattaisi ottaa yhteyttä?",
-    ],
-  };
-
-  return followUps[agentType] || [];
+  return [...(AGENT_FOLLOW_UPS[agentType] || [])];
 }
 
 export async function getConversations(userId: number, limit: number = 20) {
@@ -7,6 +7,7 @@
 
 import type { AgentTool, UserContext } from "../types";
 import { AgentMessenger, SharedKnowledge, type SignalPayload } from "../core";
+import { fetchSerper } from "../../serper";
 
 // Tool: Search jobs based on criteria
 export const searchJobsTool: AgentTool = {
@@ -442,18 +443,11 @@ Palauttaa: kokonaispistemäärän (0-100), ennusteen ja toimintaohjeet.`,
     try {
       const SERPER_API_KEY = process.env.SERPER_API_KEY;
       if (SERPER_API_KEY) {
-        const newsResponse = await fetch("https://google.serper.dev/search", {
-          method: "POST",
-          headers: {
-            "X-API-KEY": SERPER_API_KEY,
-            "Content-Type": "application/json",
-          },
-          body: JSON.stringify({
-            q: `"${companyName}" rekrytointi OR rahoitus OR kasvu OR YT-neuvottelut OR laajentuminen 2024 2025`,
-            gl: "fi",
-            hl: "fi",
-            num: 10,
-          }),
+        const newsResponse = await fetchSerper(SERPER_API_KEY, {
+          q: `"${companyName}" rekrytointi OR rahoitus OR kasvu OR YT-neuvottelut OR laajentuminen 2024 2025`,
+          gl: "fi",
+          hl: "fi",
+          num: 10,
         });
         
         if (newsResponse.ok) {
@@ -580,18 +574,11 @@ Tunnistaa: rahoituskierrokset, laajentuminen, YT-neuvottelut, johtajamuutokset.`
     
     const keywords = args.keywords?.join(" OR ") || "rekrytointi kasvu rahoitus";
     
-    const response = await fetch("https://google.serper.dev/search", {
-      method: "POST",
-      headers: {
-        "X-API-KEY": SERPER_API_KEY,
-        "Content-Type": "application/json",
-      },
-      body: JSON.stringify({
-        q: `"${args.companyName}" ${keywords} 2024 2025`,
-        gl: "fi",
-        hl: "fi",
-        num: 10,
-      }),
+    const response = await fetchSerper(SERPER_API_KEY, {
+      q: `"${args.companyName}" ${keywords} 2024 2025`,
+      gl: "fi",
+      hl: "fi",
+      num: 10,
     });
     
     if (!response.ok) {
@@ -880,19 +867,12 @@ Sentimenttianalyysi viestien sävystä.`,
     const query = `site:twitter.com OR site:x.com "${companyName}" (rekrytointi OR hiring OR "we're hiring" OR palkkaa OR työpaikka)`;
     
     try {
-      const response = await fetch("https://google.serper.dev/search", {
-        method: "POST",
-        headers: {
-          "X-API-KEY": SERPER_API_KEY,
-          "Content-Type": "application/json",
-        },
-        body: JSON.stringify({
-          q: query,
-          gl: "fi",
-          hl: "fi",
-          num: 10,
-          tbs: `qdr:d${daysBack}`
-        }),
+      const response = await fetchSerper(SERPER_API_KEY, {
+        q: query,
+        gl: "fi",
+        hl: "fi",
+        num: 10,
+        tbs: `qdr:d${daysBack}`
       });
       
       if (!response.ok) {
@@ -1003,14 +983,7 @@ Analysoi: työntekijätyytyväisyyttä, rekrytointitrendi, yrityskulttuurisignaa
     try {
       const results = await Promise.all(
         queries.map(async (q) => {
-          const response = await fetch("https://google.serper.dev/search", {
-            method: "POST",
-            headers: {
-              "X-API-KEY": SERPER_API_KEY,
-              "Content-Type": "application/json",
-            },
-            body: JSON.stringify({ q, num: 5 }),
-          });
+          const response = await fetchSerper(SERPER_API_KEY, { q, num: 5 });
           
           if (!response.ok) return [];
           const data = await response.json();
@@ -1048,13 +1021,20 @@ Analysoi: työntekijätyytyväisyyttä, rekrytointitrendi, yrityskulttuurisignaa
         };
       });
       
-      const ratingsFound = reviews.filter((r: any) => r.rating !== null);
-      const avgRating = ratingsFound.length > 0
-        ? (ratingsFound.reduce((sum: number, r: any) => sum + (r.rating || 0), 0) / ratingsFound.length).toFixed(1)
-        : null;
-      
-      const positiveCount = reviews.filter((r: any) => r.sentiment === "positive").length;
-      const negativeCount = reviews.filter((r: any) => r.sentiment === "negative").length;
+      // Arviot ja sentimentti lasketaan yhdellä läpikäynnillä
+      let ratingCount = 0;
+      let ratingSum = 0;
+      let positiveCount = 0;
+      let negativeCount = 0;
+      for (const r of reviews as any[]) {
+        if (r.rating !== null) {
+          ratingCount++;
+          ratingSum += r.rating || 0;
+        }
+        if (r.sentiment === "positive") positiveCount++;
+        else if (r.sentiment === "negative") negativeCount++;
+      }
+      const avgRating = ratingCount > 0 ? (ratingSum / ratingCount).toFixed(1) : null;
       
       return {
         success: true,
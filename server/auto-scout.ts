@@ -5,16 +5,35 @@
 
 import { sendJobAlertEmail } from "./email";
 import { scoutJobs } from "./scout";
+import type { InsertMatch } from "../drizzle/schema";
+
+type AutoScoutRunResult = {
+  usersProcessed: number;
+  emailsSent: number;
+  errors: string[];
+};
+
+// Käynnissä oleva ajo - päällekkäiset cron-/admin-kutsut liittyvät samaan ajoon
+// sen sijaan että käsittelisivät samat käyttäjät (ja lähettäisivät sähköpostit) kahdesti
+let inFlightRun: Promise<AutoScoutRunResult> | null = null;
 
 /**
  * Run auto scout for all eligible users
  * Should be called by a cron job or scheduler
  */
-export async function runAutoScout(): Promise<{
-  usersProcessed: number;
-  emailsSent: number;
-  errors: string[];
-}> {
+export function runAutoScout(): Promise<AutoScoutRunResult> {
+  if (inFlightRun) {
+    console.log("[AutoScout] Run already in progress - joining existing run");
+    return inFlightRun;
+  }
+
+  inFlightRun = executeAutoScout().finally(() => {
+    inFlightRun = null;
+  });
+  return inFlightRun;
+}
+
+async function executeAutoScout(): Promise<AutoScoutRunResult> {
   const { getDb } = await import("./db");
   const db = await getDb();
   
@@ -94,10 +113,9 @@ export async function runAutoScout(): Promise<{
         }
 
         // Save jobs to database and create matches
-        const { createJob, createMatch, getProfileByUserId } = await import("./db");
+        const { createJob, createMatches, getMatchedJobIds } = await import("./db");
         const { calculateMatch } = await import("./matching");
         
-        let newMatches = 0;
         const jobsForEmail: Array<{
           title: string;
           company: string;
@@ -105,36 +123,41 @@ export async function runAutoScout(): Promise<{
           url: string;
           matchScore?: number;
         }> = [];
+        const pendingMatches: Array<{ match: InsertMatch; email: (typeof jobsForEmail)[number] }> = [];
+        const pendingJobIds = new Set<number>();
 
         for (const jobData of allJobs) {
           try {
-            // Create or get existing job
-            const job = await createJob(jobData);
-            if (!job || typeof job === 'object' && 'affectedRows' in job) continue;
+            // Create or get existing job (uusi rivi palauttaa vain insertId:n)
+            const created = await createJob(jobData);
+            const jobId = (created as any)?.insertId || (created as any)?.id;
+            if (!jobId) continue;
+            const job: any = (created as any).insertId ? { ...jobData, id: jobId } : created;
 
             // Calculate match
             const matchScore = calculateMatch(profile, job);
             
-            // Create match if score is reasonable
-            if (matchScore.totalScore >= 40) {
-              await createMatch({
-                userId: user.id,
-                jobId: job.id,
-                totalScore: matchScore.totalScore,
-                skillScore: matchScore.skillScore,
-                experienceScore: matchScore.experienceScore,
-                locationScore: matchScore.locationScore,
-                salaryScore: matchScore.salaryScore,
-                matchCategory: matchScore.matchCategory,
-              });
-              newMatches++;
-              
-              jobsForEmail.push({
-                title: job.title,
-                company: job.company || "Yritys",
-                location: job.location || "Suomi",
-                url: job.url || "",
-                matchScore: matchScore.totalScore,
+            // Create match if score is reasonable (sama työpaikka voi tulla useasta lähteestä)
+            if (matchScore.totalScore >= 40 && !pendingJobIds.has(jobId)) {
+              pendingJobIds.add(jobId);
+              pendingMatches.push({
+                match: {
+                  userId: user.id,
+                  jobId,
+                  totalScore: matchScore.totalScore,
+                  skillScore: matchScore.skillScore,
+                  experienceScore: matchScore.experienceScore,
+                  locationScore: matchScore.locationScore,
+                  salaryScore: matchScore.salaryScore,
+                  matchCategory: matchScore.matchCategory,
+                },
+                email: {
+                  title: job.title,
+                  company: job.company || "Yritys",
+                  location: job.location || "Suomi",
+                  url: job.url || "",
+                  matchScore: matchScore.totalScore,
+                },
               });
             }
           } catch (e) {
@@ -142,6 +165,17 @@ export async function runAutoScout(): Promise<{
           }
         }
 
+        // Vain uudet matchit tallennetaan ja lähetetään sähköpostissa - yksi haku ja yksi monirivinen INSERT
+        const alreadyMatched = await getMatchedJobIds(user.id, pendingMatches.map(p => p.match.jobId));
+        const freshMatches = pendingMatches.filter(p => !alreadyMatched.has(p.match.jobId));
+        const newMatches = await createMatches(freshMatches.map(p => p.match));
+        for (const p of freshMatches) jobsForEmail.push(p.email);
+
+        if (newMatches > 0) {
+          const { invalidateUserContext } = await import("./agents/context");
+          invalidateUserContext(user.id);
+        }
+
         console.log(`[AutoScout] User ${user.id}: ${totalJobs} jobs, ${newMatches} matches`);
 
         // Send email if enabled and there are new matches
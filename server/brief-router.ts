@@ -1,9 +1,19 @@
 // server/brief-router.ts
 import { protectedProcedure, router } from "./_core/trpc";
+import { getAnthropicClient } from "./_core/ai-clients";
+import { ENV } from "./_core/env";
 import { selectLeadStory, computeProfileCompleteness } from "../shared/lib/brief-logic";
 import { lintAgentNote } from "../shared/lib/voice-lint";
 import type { MatchEntry, SignalEntry } from "../shared/lib/brief-logic";
 
+type AgentNoteId = "signal_scout" | "career_coach" | "job_analyzer";
+
+const AGENT_NOTE_BYLINES: Record<AgentNoteId, string> = {
+  signal_scout: "Väinö — kenttäraportti",
+  career_coach: "Kaisa — kolumni",
+  job_analyzer: "Työpaikka-analyytikko — kritiikki",
+};
+
 export const briefRouter = router({
   // ── 1. Lead Story ────────────────────────────────────────────────────────
   leadStory: protectedProcedure.query(async ({ ctx }) => {
@@ -47,7 +57,7 @@ export const briefRouter = router({
                    e.eventType, e.publishedAt, e.impactStrength
             FROM events e
             JOIN companies c ON e.companyId = c.id
-            WHERE e.companyId IN (${sql.raw(companyIds.join(","))})
+            WHERE e.companyId IN (${sql.join(companyIds.map(id => sql`${id}`), sql`, `)})
               AND e.publishedAt > DATE_SUB(NOW(), INTERVAL 24 HOUR)
             ORDER BY e.impactStrength DESC
             LIMIT 10
@@ -96,7 +106,10 @@ export const briefRouter = router({
     const entries = await Promise.all(
       watchlist.slice(0, 6).map(async (w: any) => {
         const events = (await getEventsByCompanyId(w.companyId, 3)) as any[];
+        const latestPublishedAt = events[0]?.publishedAt;
         return {
+          // Aikaleima lasketaan kerran per rivi eikä jokaisessa sort-vertailussa
+          latestTs: latestPublishedAt ? new Date(latestPublishedAt).getTime() : 0,
           companyId: w.companyId,
           companyName: w.companyName,
           industry: w.industry ?? null,
@@ -114,31 +127,36 @@ export const briefRouter = router({
 
     return entries
       .filter(e => e.latestEvents.length > 0)
-      .sort((a, b) => {
-        const aDate = a.latestEvents[0]?.publishedAt ? new Date(a.latestEvents[0].publishedAt).getTime() : 0;
-        const bDate = b.latestEvents[0]?.publishedAt ? new Date(b.latestEvents[0].publishedAt).getTime() : 0;
-        return bDate - aDate;
-      })
-      .slice(0, 3);
+      .sort((a, b) => b.latestTs - a.latestTs)
+      .slice(0, 3)
+      .map(({ latestTs, ...entry }) => entry);
   }),
 
   // ── 4. Agent Notes ───────────────────────────────────────────────────────
   agentNotes: protectedProcedure.query(async ({ ctx }) => {
-    const Anthropic = (await import("@anthropic-ai/sdk")).default;
+    // Ilman API-avainta jokainen kutsu epäonnistuisi - palauta tyhjät muistiot ennen DB-hakuja
+    if (!ENV.anthropicApiKey) {
+      return (Object.keys(AGENT_NOTE_BYLINES) as AgentNoteId[]).map(agentId => ({
+        agentId,
+        byline: AGENT_NOTE_BYLINES[agentId],
+        note: "",
+      }));
+    }
+
     const { getMatchesByUserId, getWatchlist, getProfileByUserId } = await import("./db");
 
-    const [rawMatches, watchlist, profile] = await Promise.all([
+    const [rawMatches, watchlist, profile, client] = await Promise.all([
       getMatchesByUserId(ctx.user.id, 5),
       getWatchlist(ctx.user.id),
       getProfileByUserId(ctx.user.id),
+      getAnthropicClient(),
     ]);
 
-    const client = new Anthropic({ apiKey: process.env.ANTHROPIC_API_KEY });
     const topMatch = (rawMatches as any[])[0];
     const topCompany = (watchlist as any[])[0];
 
     type AgentConfig = {
-      agentId: "signal_scout" | "career_coach" | "job_analyzer";
+      agentId: AgentNoteId;
       byline: string;
       prompt: string;
     };
@@ -146,7 +164,7 @@ export const briefRouter = router({
     const configs: AgentConfig[] = [
       {
         agentId: "signal_scout",
-        byline: "Väinö — kenttäraportti",
+        byline: AGENT_NOTE_BYLINES.signal_scout,
         prompt: `Kirjoita lyhyt kenttäraportti (2-3 virkettä) työnhakumarkkinan signaalista suomalaiselle työnhakijalle.
 Konteksti: ${topCompany ? `${topCompany.companyName} seurantalistalla, ${topCompany.recentEventsCount ?? 0} signaalia 30 päivässä.` : "Ei watchlist-yrityksiä."}
 Tyyli: kenttäreportteri, kolmannessa persoonassa, faktat edellä. Ei toisen persoonan puhuttelua (ei "sinun", ei "profiilistasi").
@@ -154,7 +172,7 @@ Vastaa pelkkä teksti, ei otsikoita.`,
       },
       {
         agentId: "career_coach",
-        byline: "Kaisa — kolumni",
+        byline: AGENT_NOTE_BYLINES.career_coach,
         prompt: `Kirjoita lyhyt kolumni (2-3 virkettä) CV-neuvona suomalaiselle työnhakijalle.
 Konteksti: ${profile ? `Kokemus ${(profile as any).yearsOfExperience ?? "?"} vuotta, taidot: ${(profile as any).skills ?? "ei tiedossa"}.` : "Profiili puuttuu."}
 Tyyli: kolumnisti, henkilökohtainen, käytä "sinun"/"profiilistasi" luontevasti. Ei kenttäraportteri-jargonia (ei "Signaali:", "Lähde:", "PRH-rekisteri").
@@ -162,7 +180,7 @@ Vastaa pelkkä teksti.`,
       },
       {
         agentId: "job_analyzer",
-        byline: "Työpaikka-analyytikko — kritiikki",
+        byline: AGENT_NOTE_BYLINES.job_analyzer,
         prompt: `Kirjoita lyhyt kriittinen analyysi (2-3 virkettä) yhdestä avoinna olevasta työpaikasta suomalaiselle työnhakijalle.
 Konteksti: ${topMatch ? `Paras matchi: ${topMatch.title} @ ${topMatch.company}, ${topMatch.totalScore}% sopivuus.` : "Ei matcheja."}
 Tyyli: kriitikko, analyyttinen, ei kehuvaa kieltä (ei "Hienoa", "Mahtavaa", "Erinomaisesti"). Nosta myös heikkoudet esiin.
@@ -203,12 +221,12 @@ Vastaa pelkkä teksti.`,
 
   // ── 5. Sidebar ───────────────────────────────────────────────────────────
   sidebar: protectedProcedure.query(async ({ ctx }) => {
-    const { getMatchesByUserId, getSavedJobsByUserId, getWatchlist, getProfileByUserId, getDb } = await import("./db");
+    const { getMatchesByUserId, countSavedJobsByUserId, getWatchlist, getProfileByUserId, getDb } = await import("./db");
     const { sql } = await import("drizzle-orm");
 
-    const [rawMatches, savedJobs, watchlist, profile] = await Promise.all([
+    const [rawMatches, savedJobsCount, watchlist, profile] = await Promise.all([
       getMatchesByUserId(ctx.user.id, 100),
-      getSavedJobsByUserId(ctx.user.id),
+      countSavedJobsByUserId(ctx.user.id),
       getWatchlist(ctx.user.id),
       getProfileByUserId(ctx.user.id),
     ]);
@@ -235,7 +253,7 @@ Vastaa pelkkä teksti.`,
             SELECT e.headline, c.name as companyName, e.publishedAt, e.eventType
             FROM events e
             JOIN companies c ON e.companyId = c.id
-            WHERE e.companyId IN (${sql.raw(companyIds.join(","))})
+            WHERE e.companyId IN (${sql.join(companyIds.map(id => sql`${id}`), sql`, `)})
               AND e.publishedAt > DATE_SUB(NOW(), INTERVAL 24 HOUR)
             ORDER BY e.publishedAt DESC
             LIMIT 6
@@ -253,7 +271,7 @@ Vastaa pelkkä teksti.`,
     return {
       metrics: {
         matchesToday,
-        savedJobsCount: (savedJobs as any[]).length,
+        savedJobsCount,
         watchlistCount: (watchlist as any[]).length,
         profileCompleteness: completeness,
       },
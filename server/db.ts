@@ -1,5 +1,6 @@
 import { and, desc, eq, gte, sql } from "drizzle-orm";
 import { drizzle } from "drizzle-orm/mysql2";
+import mysql from "mysql2/promise";
 import { 
   InsertUser, users, profiles, InsertProfile, jobs, InsertJob, 
   matches, InsertMatch, savedJobs, scoutHistory, InsertScoutHistory,
@@ -9,10 +10,27 @@ import {
   normalizeCompanyName
 } from "../drizzle/schema";
 import { ENV } from './_core/env';
+import { TtlCache } from './ttl-cache';
 
 let _db: ReturnType<typeof drizzle> | null = null;
 let _dbConnectionError: Error | null = null;
 
+// Yhteyspoolin koko; voidaan säätää DB_POOL_SIZE-ympäristömuuttujalla
+const DB_POOL_SIZE = ENV.dbPoolSize;
+
+function createPool(databaseUrl: string) {
+  return mysql.createPool({
+    uri: databaseUrl,
+    connectionLimit: DB_POOL_SIZE,
+    maxIdle: DB_POOL_SIZE,
+    idleTimeout: 60_000,
+    waitForConnections: true,
+    queueLimit: 0,
+    enableKeepAlive: true,
+    keepAliveInitialDelay: 10_000,
+  });
+}
+
 export async function getDb() {
   if (_db) return _db;
 
@@ -23,7 +41,7 @@ export async function getDb() {
   }
 
   try {
-    _db = drizzle(process.env.DATABASE_URL);
+    _db = drizzle({ client: createPool(process.env.DATABASE_URL) });
     _dbConnectionError = null;
     console.log("[Database] Connected successfully");
     return _db;
@@ -114,58 +132,81 @@ export async function upsertProfile(profile: InsertProfile) {
   const db = await getDb();
   if (!db) throw new Error("Database not available");
   
-  const existing = await getProfileByUserId(profile.userId);
-  if (existing) {
-    // Use COALESCE so that omitted fields (undefined → null) keep their existing value
-    const v = (x: any) => (x === undefined ? null : x);
-    await db.execute(sql`
-      UPDATE profiles SET
-        currentTitle = COALESCE(${v(profile.currentTitle)}, currentTitle),
-        yearsOfExperience = COALESCE(${v(profile.yearsOfExperience)}, yearsOfExperience),
-        skills = COALESCE(${v(profile.skills)}, skills),
-        languages = COALESCE(${v(profile.languages)}, languages),
-        certifications = COALESCE(${v(profile.certifications)}, certifications),
-        degree = COALESCE(${v(profile.degree)}, degree),
-        field = COALESCE(${v(profile.field)}, field),
-        university = COALESCE(${v(profile.university)}, university),
-        graduationYear = COALESCE(${v(profile.graduationYear)}, graduationYear),
-        preferredLocations = COALESCE(${v(profile.preferredLocations)}, preferredLocations),
-        preferredJobTitles = COALESCE(${v(profile.preferredJobTitles)}, preferredJobTitles),
-        preferredIndustries = COALESCE(${v(profile.preferredIndustries)}, preferredIndustries),
-        salaryMin = COALESCE(${v(profile.salaryMin)}, salaryMin),
-        salaryMax = COALESCE(${v(profile.salaryMax)}, salaryMax),
-        remotePreference = COALESCE(${v(profile.remotePreference)}, remotePreference),
-        employmentTypes = COALESCE(${v(profile.employmentTypes)}, employmentTypes),
-        targetFunctions = COALESCE(${v(profile.targetFunctions)}, targetFunctions),
-        workHistory = COALESCE(${v(profile.workHistory)}, workHistory),
-        updatedAt = NOW()
-      WHERE userId = ${profile.userId}
-    `);
-  } else {
-    await db.execute(sql`
-      INSERT INTO profiles (userId, currentTitle, yearsOfExperience, skills, languages, certifications, degree, field, university, graduationYear, preferredLocations, preferredJobTitles, preferredIndustries, salaryMin, salaryMax, remotePreference, employmentTypes, targetFunctions, workHistory)
-      VALUES (${profile.userId}, ${profile.currentTitle || null}, ${profile.yearsOfExperience || null}, ${profile.skills || null}, ${profile.languages || null}, ${profile.certifications || null}, ${profile.degree || null}, ${profile.field || null}, ${profile.university || null}, ${profile.graduationYear || null}, ${profile.preferredLocations || null}, ${profile.preferredJobTitles || null}, ${profile.preferredIndustries || null}, ${profile.salaryMin || null}, ${profile.salaryMax || null}, ${profile.remotePreference || null}, ${profile.employmentTypes || null}, ${profile.targetFunctions || null}, ${profile.workHistory || null})
-    `);
-  }
+  // Yksi INSERT ... ON DUPLICATE KEY UPDATE (profiles.userId on UNIQUE) - ei erillistä SELECTiä ennen kirjoitusta.
+  // COALESCE pitää olemassa olevan arvon kentille jotka jätettiin pois (undefined → null)
+  const v = (x: any) => (x === undefined ? null : x);
+  await db.execute(sql`
+    INSERT INTO profiles (userId, currentTitle, yearsOfExperience, skills, languages, certifications, degree, field, university, graduationYear, preferredLocations, preferredJobTitles, preferredIndustries, salaryMin, salaryMax, remotePreference, employmentTypes, targetFunctions, workHistory)
+    VALUES (${profile.userId}, ${v(profile.currentTitle)}, ${v(profile.yearsOfExperience)}, ${v(profile.skills)}, ${v(profile.languages)}, ${v(profile.certifications)}, ${v(profile.degree)}, ${v(profile.field)}, ${v(profile.university)}, ${v(profile.graduationYear)}, ${v(profile.preferredLocations)}, ${v(profile.preferredJobTitles)}, ${v(profile.preferredIndustries)}, ${v(profile.salaryMin)}, ${v(profile.salaryMax)}, ${v(profile.remotePreference)}, ${v(profile.employmentTypes)}, ${v(profile.targetFunctions)}, ${v(profile.workHistory)})
+    ON DUPLICATE KEY UPDATE
+      currentTitle = COALESCE(VALUES(currentTitle), currentTitle),
+      yearsOfExperience = COALESCE(VALUES(yearsOfExperience), yearsOfExperience),
+      skills = COALESCE(VALUES(skills), skills),
+      languages = COALESCE(VALUES(languages), languages),
+      certifications = COALESCE(VALUES(certifications), certifications),
+      degree = COALESCE(VALUES(degree), degree),
+      field = COALESCE(VALUES(field), field),
+      university = COALESCE(VALUES(university), university),
+      graduationYear = COALESCE(VALUES(graduationYear), graduationYear),
+      preferredLocations = COALESCE(VALUES(preferredLocations), preferredLocations),
+      preferredJobTitles = COALESCE(VALUES(preferredJobTitles), preferredJobTitles),
+      preferredIndustries = COALESCE(VALUES(preferredIndustries), preferredIndustries),
+      salaryMin = COALESCE(VALUES(salaryMin), salaryMin),
+      salaryMax = COALESCE(VALUES(salaryMax), salaryMax),
+      remotePreference = COALESCE(VALUES(remotePreference), remotePreference),
+      employmentTypes = COALESCE(VALUES(employmentTypes), employmentTypes),
+      targetFunctions = COALESCE(VALUES(targetFunctions), targetFunctions),
+      workHistory = COALESCE(VALUES(workHistory), workHistory),
+      updatedAt = NOW()
+  `);
 }
 
 // ============== COMPANY QUERIES ==============
 
-export async function getOrCreateCompany(name: string, data?: Partial<InsertCompany>) {
+// Käynnissä olevat getOrCreateCompany-kutsut normalisoidun nimen mukaan: samanaikaiset
+// kutsut samalle yritykselle jakavat yhden haun/luonnin eivätkä luo duplikaattirivejä
+const companyInFlight = new Map<string, Promise<any>>();
+
+export function getOrCreateCompany(name: string, data?: Partial<InsertCompany>) {
+  const normalized = normalizeCompanyName(name);
+
+  const pending = companyInFlight.get(normalized);
+  if (pending) return pending;
+
+  const promise = fetchOrCreateCompany(name, normalized, data).finally(() => {
+    companyInFlight.delete(normalized);
+  });
+  companyInFlight.set(normalized, promise);
+  return promise;
+}
+
+// lastSeenAt-päivitys tehdään yritykselle korkeintaan kerran aikaikkunassa: uutiserät viittaavat
+// samoihin yrityksiin toistuvasti, ja aktiivisuus luetaan päivien tarkkuudella (getActiveCompanies)
+const LAST_SEEN_TOUCH_INTERVAL_MS = 10 * 60 * 1000;
+const LAST_SEEN_TOUCH_MAX_ENTRIES = 10_000;
+const recentlyTouchedCompanies = new TtlCache<number, true>(LAST_SEEN_TOUCH_INTERVAL_MS, LAST_SEEN_TOUCH_MAX_ENTRIES);
+
+function shouldTouchLastSeen(companyId: number): boolean {
+  if (recentlyTouchedCompanies.get(companyId)) return false;
+  recentlyTouchedCompanies.set(companyId, true);
+  return true;
+}
+
+async function fetchOrCreateCompany(name: string, normalized: string, data?: Partial<InsertCompany>) {
   const db = await getDb();
   if (!db) throw new Error("Database not available");
 
-  const normalized = normalizeCompanyName(name);
-  
   const existingResult = await db.execute(sql`
     SELECT * FROM companies WHERE nameNormalized = ${normalized} LIMIT 1
   `);
   const existing = (existingResult[0] as any[]) || [];
 
   if (existing.length > 0) {
-    await db.execute(sql`
-      UPDATE companies SET lastSeenAt = NOW() WHERE id = ${existing[0].id}
-    `);
+    if (shouldTouchLastSeen(existing[0].id)) {
+      await db.execute(sql`
+        UPDATE companies SET lastSeenAt = NOW() WHERE id = ${existing[0].id}
+      `);
+    }
     return existing[0];
   }
 
@@ -289,35 +330,52 @@ export async function updateCompanyById(companyId: number, updates: Partial<Inse
 
 // ============== EVENT QUERIES ==============
 
-export async function createEvent(event: InsertEvent) {
+/**
+ * Tallentaa joukon eventtejä kerralla: yksi duplikaattitarkistus ja monirivinen INSERT per erä.
+ * Tarkistus vertaa headline-saraketta suoraan parametriin (ei johdettuun sarakkeeseen), jolloin
+ * MySQL käyttää aina sarakkeen omaa collationia yhteyden collationista riippumatta. Osumat
+ * palautetaan syötteen indekseinä, joten JS:n ei tarvitse vertailla otsikoita itse.
+ * Palauttaa uusien rivien määrän.
+ */
+export async function createEvents(eventsToCreate: InsertEvent[], chunkSize: number = 100) {
+  if (eventsToCreate.length === 0) return 0;
+
   const db = await getDb();
   if (!db) throw new Error("Database not available");
-  
-  // Use raw SQL to avoid Drizzle ORM bug with column names
-  const existing = await db.execute(sql`
-    SELECT * FROM events 
-    WHERE companyId = ${event.companyId} AND headline = ${event.headline}
-    LIMIT 1
-  `);
-  
-  if (existing[0] && (existing[0] as any[]).length > 0) {
-    return (existing[0] as any[])[0];
+
+  // Yhdistä saman erän duplikaatit samalla tavalla kuin *_ci-collation:
+  // kirjainkoko, aksentit ja loppuvälilyönnit eivät erota otsikoita
+  const eventKey = (companyId: number, headline: string) =>
+    `${companyId}\u0000${headline.normalize("NFD").replace(/\p{M}/gu, "").toLowerCase().trimEnd()}`;
+  const unique = new Map<string, InsertEvent>();
+  for (const event of eventsToCreate) {
+    const key = eventKey(event.companyId, event.headline);
+    if (!unique.has(key)) unique.set(key, event);
   }
 
-  // Use raw SQL for insert to avoid Drizzle ORM syntax bug
-  await db.execute(sql`
-    INSERT INTO events (companyId, eventType, headline, summary, sourceUrl, impactStrength, functionFocus, affectedCount, confidence, publishedAt)
-    VALUES (${event.companyId}, ${event.eventType}, ${event.headline}, ${event.summary || null}, ${event.sourceUrl || null}, ${event.impactStrength || 3}, ${event.functionFocus || null}, ${event.affectedCount || null}, ${event.confidence || 0.8}, ${event.publishedAt || new Date()})
-  `);
-  
-  const created = await db.execute(sql`
-    SELECT * FROM events 
-    WHERE companyId = ${event.companyId} AND headline = ${event.headline}
-    ORDER BY id DESC
-    LIMIT 1
-  `);
-  
-  return (created[0] as any[])[0];
+  let inserted = 0;
+  const pending = Array.from(unique.values());
+
+  for (let i = 0; i < pending.length; i += chunkSize) {
+    const chunk = pending.slice(i, i + chunkSize);
+
+    const existingResult = await db.execute(sql`
+      ${sql.join(chunk.map((e, idx) => sql`(SELECT ${idx} AS idx FROM events WHERE companyId = ${e.companyId} AND headline = ${e.headline} LIMIT 1)`), sql` UNION ALL `)}
+    `);
+    const existingIdx = new Set(((existingResult[0] as any[]) || []).map(row => Number(row.idx)));
+
+    const toInsert = chunk.filter((_, idx) => !existingIdx.has(idx));
+    if (toInsert.length === 0) continue;
+
+    const values = toInsert.map(event => sql`(${event.companyId}, ${event.eventType}, ${event.headline}, ${event.summary || null}, ${event.sourceUrl || null}, ${event.impactStrength || 3}, ${event.functionFocus || null}, ${event.affectedCount || null}, ${event.confidence || 0.8}, ${event.publishedAt || new Date()})`);
+    await db.execute(sql`
+      INSERT INTO events (companyId, eventType, headline, summary, sourceUrl, impactStrength, functionFocus, affectedCount, confidence, publishedAt)
+      VALUES ${sql.join(values, sql`, `)}
+    `);
+    inserted += toInsert.length;
+  }
+
+  return inserted;
 }
 
 export async function getEventsByCompanyId(companyId: number, limit: number = 20) {
@@ -334,6 +392,35 @@ export async function getEventsByCompanyId(companyId: number, limit: number = 20
   return (result[0] as any[]) || [];
 }
 
+/**
+ * Hakee usean yrityksen tuoreimmat eventit yhdellä kyselyllä
+ * (korvaa getEventsByCompanyId-kutsun per yritys). Palauttaa Mapin companyId -> events.
+ */
+export async function getEventsByCompanyIds(companyIds: number[], perCompany: number = 5) {
+  const grouped = new Map<number, any[]>();
+  if (companyIds.length === 0) return grouped;
+
+  const db = await getDb();
+  if (!db) return grouped;
+
+  const result = await db.execute(sql`
+    SELECT * FROM (
+      SELECT e.*, ROW_NUMBER() OVER (PARTITION BY e.companyId ORDER BY e.createdAt DESC) AS rn
+      FROM events e
+      WHERE e.companyId IN (${sql.join(companyIds.map(id => sql`${id}`), sql`, `)})
+    ) ranked
+    WHERE ranked.rn <= ${perCompany}
+    ORDER BY ranked.companyId, ranked.createdAt DESC
+  `);
+
+  for (const row of (result[0] as any[]) || []) {
+    const list = grouped.get(row.companyId);
+    if (list) list.push(row);
+    else grouped.set(row.companyId, [row]);
+  }
+  return grouped;
+}
+
 export async function getRecentEvents(daysBack: number = 30, limit: number = 100) {
   const db = await getDb();
   if (!db) return [];
@@ -354,32 +441,43 @@ export async function getRecentEvents(daysBack: number = 30, limit: number = 100
 
 // ============== COMPANY SCORE QUERIES ==============
 
-export async function upsertCompanyScore(score: InsertCompanyScore) {
+/**
+ * Tallentaa usean yrityksen pisteet yhdellä kyselyllä per erä. Käyttäjä annetaan vain
+ * userId-parametrina, joten pisteriveissä ei ole omaa userId:tä joka voisi olla ristiriidassa.
+ * companyScores-taulussa ei ole (companyId, userId)-uniikkiavainta, joten olemassa olevat rivit
+ * haetaan ensin ja päivitetään pääavaimen kautta: id:llinen rivi päivittyy, id:tön lisätään.
+ */
+export async function upsertCompanyScores(userId: number | null, scores: Omit<InsertCompanyScore, "userId">[], chunkSize: number = 100) {
+  if (scores.length === 0) return;
+
   const db = await getDb();
   if (!db) throw new Error("Database not available");
-  
-  const existingResult = await db.execute(sql`
-    SELECT * FROM companyScores 
-    WHERE companyId = ${score.companyId} 
-    AND ${score.userId ? sql`userId = ${score.userId}` : sql`userId IS NULL`}
-    LIMIT 1
-  `);
-  const existing = (existingResult[0] as any[]) || [];
 
-  if (existing.length > 0) {
-    await db.execute(sql`
-      UPDATE companyScores SET 
-        talentNeedScore = ${score.talentNeedScore},
-        profileMatchScore = ${score.profileMatchScore},
-        combinedScore = ${score.combinedScore},
-        scoreReasons = ${score.scoreReasons},
-        calculatedAt = NOW()
-      WHERE id = ${existing[0].id}
+  const userFilter = userId ? sql`userId = ${userId}` : sql`userId IS NULL`;
+
+  for (let i = 0; i < scores.length; i += chunkSize) {
+    const chunk = scores.slice(i, i + chunkSize);
+
+    const existingResult = await db.execute(sql`
+      SELECT id, companyId FROM companyScores
+      WHERE ${userFilter}
+      AND companyId IN (${sql.join(chunk.map(s => sql`${s.companyId}`), sql`, `)})
     `);
-  } else {
+    const existingIds = new Map<number, number>();
+    for (const row of (existingResult[0] as any[]) || []) {
+      if (!existingIds.has(row.companyId)) existingIds.set(row.companyId, row.id);
+    }
+
+    const values = chunk.map(score => sql`(${existingIds.get(score.companyId) ?? null}, ${score.companyId}, ${userId || null}, ${score.talentNeedScore}, ${score.profileMatchScore}, ${score.combinedScore}, ${score.scoreReasons}, NOW())`);
     await db.execute(sql`
-      INSERT INTO companyScores (companyId, userId, talentNeedScore, profileMatchScore, combinedScore, scoreReasons)
-      VALUES (${score.companyId}, ${score.userId || null}, ${score.talentNeedScore}, ${score.profileMatchScore}, ${score.combinedScore}, ${score.scoreReasons})
+      INSERT INTO companyScores (id, companyId, userId, talentNeedScore, profileMatchScore, combinedScore, scoreReasons, calculatedAt)
+      VALUES ${sql.join(values, sql`, `)}
+      ON DUPLICATE KEY UPDATE
+        talentNeedScore = VALUES(talentNeedScore),
+        profileMatchScore = VALUES(profileMatchScore),
+        combinedScore = VALUES(combinedScore),
+        scoreReasons = VALUES(scoreReasons),
+        calculatedAt = VALUES(calculatedAt)
     `);
   }
 }
@@ -416,13 +514,12 @@ export async function createJob(job: InsertJob) {
     }
   }
 
-  await db.execute(sql`
+  const result = await db.execute(sql`
     INSERT INTO jobs (externalId, source, title, company, description, location, salaryMin, salaryMax, employmentType, remoteType, industry, requiredSkills, experienceRequired, postedAt, expiresAt, url, companyRating, companyId)
     VALUES (${job.externalId || null}, ${job.source || 'unknown'}, ${job.title}, ${job.company || null}, ${job.description || null}, ${job.location || null}, ${job.salaryMin || null}, ${job.salaryMax || null}, ${job.employmentType || null}, ${job.remoteType || null}, ${job.industry || null}, ${job.requiredSkills || null}, ${job.experienceRequired || null}, ${job.postedAt || new Date()}, ${job.expiresAt || null}, ${job.url || null}, ${job.companyRating || null}, ${job.companyId || null})
   `);
   
-  const result = await db.execute(sql`SELECT LAST_INSERT_ID() as insertId`);
-  return { insertId: ((result[0] as any[])[0])?.insertId };
+  return { insertId: (result[0] as any).insertId };
 }
 
 export async function getJobById(id: number) {
@@ -433,12 +530,20 @@ export async function getJobById(id: number) {
   return rows.length > 0 ? rows[0] : undefined;
 }
 
-export async function getJobs(limit: number = 50, offset: number = 0) {
+/**
+ * Listaa työpaikat uusimmasta vanhimpaan. Sivutus joko keysetillä (beforeId = edellisen sivun
+ * viimeisen rivin id, käyttää primääriavainta) tai vanhalla OFFSETilla taaksepäin-yhteensopivuuden vuoksi.
+ */
+export async function getJobs(limit: number = 50, offset: number = 0, beforeId?: number) {
   const db = await getDb();
   if (!db) return [];
-  const result = await db.execute(sql`
-    SELECT * FROM jobs ORDER BY createdAt DESC LIMIT ${limit} OFFSET ${offset}
-  `);
+  const result = beforeId !== undefined
+    ? await db.execute(sql`
+        SELECT * FROM jobs WHERE id < ${beforeId} ORDER BY id DESC LIMIT ${limit}
+      `)
+    : await db.execute(sql`
+        SELECT * FROM jobs ORDER BY id DESC LIMIT ${limit} OFFSET ${offset}
+      `);
   return (result[0] as any[]) || [];
 }
 
@@ -451,6 +556,34 @@ export async function getJobsByCompanyId(companyId: number, limit: number = 50)
   return (result[0] as any[]) || [];
 }
 
+/**
+ * Hakee usean yrityksen tuoreimmat työpaikat yhdellä kyselyllä. Palauttaa Mapin companyId -> jobs.
+ */
+export async function getJobsByCompanyIds(companyIds: number[], perCompany: number = 50) {
+  const grouped = new Map<number, any[]>();
+  if (companyIds.length === 0) return grouped;
+
+  const db = await getDb();
+  if (!db) return grouped;
+
+  const result = await db.execute(sql`
+    SELECT * FROM (
+      SELECT j.*, ROW_NUMBER() OVER (PARTITION BY j.companyId ORDER BY j.createdAt DESC) AS rn
+      FROM jobs j
+      WHERE j.companyId IN (${sql.join(companyIds.map(id => sql`${id}`), sql`, `)})
+    ) ranked
+    WHERE ranked.rn <= ${perCompany}
+    ORDER BY ranked.companyId, ranked.createdAt DESC
+  `);
+
+  for (const row of (result[0] as any[]) || []) {
+    const list = grouped.get(row.companyId);
+    if (list) list.push(row);
+    else grouped.set(row.companyId, [row]);
+  }
+  return grouped;
+}
+
 export async function linkJobToCompany(jobId: number, companyId: number) {
   const db = await getDb();
   if (!db) throw new Error("Database not available");
@@ -459,23 +592,44 @@ export async function linkJobToCompany(jobId: number, companyId: number) {
 
 // ============== MATCH QUERIES ==============
 
-export async function createMatch(match: InsertMatch) {
+/**
+ * Tallentaa useamman matchin kerralla monirivisellä INSERT IGNORE -kyselyllä.
+ * Jo olemassa olevat (userId, jobId)-parit ohitetaan unique_user_job-avaimen kautta.
+ * Palauttaa uusien rivien määrän.
+ */
+export async function createMatches(matchesToCreate: InsertMatch[], chunkSize: number = 100) {
+  if (matchesToCreate.length === 0) return 0;
+
   const db = await getDb();
   if (!db) throw new Error("Database not available");
-  await db.execute(sql`
-    INSERT INTO matches (userId, jobId, totalScore, skillScore, experienceScore, locationScore, salaryScore, industryScore, companyScore, matchCategory, status)
-    VALUES (${match.userId}, ${match.jobId}, ${match.totalScore || 0}, ${match.skillScore || 0}, ${match.experienceScore || 0}, ${match.locationScore || 0}, ${match.salaryScore || 0}, ${match.industryScore || 0}, ${match.companyScore || 0}, ${match.matchCategory || 'weak'}, ${match.status || 'new'})
-  `);
+
+  let inserted = 0;
+  for (let i = 0; i < matchesToCreate.length; i += chunkSize) {
+    const chunk = matchesToCreate.slice(i, i + chunkSize);
+    const values = chunk.map(match => sql`(${match.userId}, ${match.jobId}, ${match.totalScore || 0}, ${match.skillScore || 0}, ${match.experienceScore || 0}, ${match.locationScore || 0}, ${match.salaryScore || 0}, ${match.industryScore || 0}, ${match.companyScore || 0}, ${match.matchCategory || 'weak'}, ${match.status || 'new'})`);
+    const result = await db.execute(sql`
+      INSERT IGNORE INTO matches (userId, jobId, totalScore, skillScore, experienceScore, locationScore, salaryScore, industryScore, companyScore, matchCategory, status)
+      VALUES ${sql.join(values, sql`, `)}
+    `);
+    inserted += (result[0] as any).affectedRows || 0;
+  }
+
+  return inserted;
 }
 
-export async function checkMatchExists(userId: number, jobId: number): Promise<boolean> {
+/**
+ * Palauttaa ne jobId:t, joille käyttäjällä on jo match - koko erä yhdellä kyselyllä
+ */
+export async function getMatchedJobIds(userId: number, jobIds: number[]): Promise<Set<number>> {
+  if (jobIds.length === 0) return new Set();
   const db = await getDb();
-  if (!db) return false;
+  if (!db) return new Set();
   const result = await db.execute(sql`
-    SELECT id FROM matches WHERE userId = ${userId} AND jobId = ${jobId} LIMIT 1
+    SELECT jobId FROM matches
+    WHERE userId = ${userId} AND jobId IN (${sql.join(jobIds.map(id => sql`${id}`), sql`, `)})
   `);
   const rows = (result[0] as any[]) || [];
-  return rows.length > 0;
+  return new Set(rows.map((r: any) => r.jobId));
 }
 
 export async function getMatchesByUserId(userId: number, limit: number = 50) {
@@ -492,6 +646,24 @@ export async function getMatchesByUserId(userId: number, limit: number = 50) {
   return (result[0] as any[]) || [];
 }
 
+/**
+ * Kevyt versio agenttikontekstille: pisteet ja työpaikan otsikko/yritys, ei koko työpaikkariviä
+ */
+export async function getMatchSummariesByUserId(userId: number, limit: number = 50) {
+  const db = await getDb();
+  if (!db) return [];
+  const result = await db.execute(sql`
+    SELECT m.jobId, j.title as jobTitle, j.company, m.totalScore, m.skillScore,
+           m.experienceScore, m.locationScore, m.matchCategory
+    FROM matches m
+    INNER JOIN jobs j ON m.jobId = j.id
+    WHERE m.userId = ${userId}
+    ORDER BY m.totalScore DESC
+    LIMIT ${limit}
+  `);
+  return (result[0] as any[]) || [];
+}
+
 // ============== SAVED JOBS QUERIES ==============
 
 export async function saveJob(userId: number, jobId: number, notes?: string) {
@@ -521,6 +693,38 @@ export async function getSavedJobsByUserId(userId: number) {
   return (result[0] as any[]) || [];
 }
 
+/**
+ * Kevyt versio agenttikontekstille: vain kontekstin käyttämät sarakkeet, ei kuvauksia
+ */
+export async function getSavedJobSummariesByUserId(userId: number) {
+  const db = await getDb();
+  if (!db) return [];
+  const result = await db.execute(sql`
+    SELECT j.id, j.title, j.company, j.location, j.salaryMin, j.salaryMax,
+           j.employmentType, j.remoteType, j.industry, j.requiredSkills, j.url
+    FROM savedJobs sj
+    INNER JOIN jobs j ON sj.jobId = j.id
+    WHERE sj.userId = ${userId}
+    ORDER BY sj.savedAt DESC
+  `);
+  return (result[0] as any[]) || [];
+}
+
+/**
+ * Tallennettujen työpaikkojen määrä - COUNT tietokannassa, rivejä ei siirretä
+ */
+export async function countSavedJobsByUserId(userId: number): Promise<number> {
+  const db = await getDb();
+  if (!db) return 0;
+  const result = await db.execute(sql`
+    SELECT COUNT(*) as count
+    FROM savedJobs sj
+    INNER JOIN jobs j ON sj.jobId = j.id
+    WHERE sj.userId = ${userId}
+  `);
+  return Number(((result[0] as any[])[0])?.count) || 0;
+}
+
 // ============== SCOUT HISTORY QUERIES ==============
 
 export async function createScoutHistory(history: InsertScoutHistory) {
@@ -546,12 +750,11 @@ export async function getScoutHistoryByUserId(userId: number, limit: number = 20
 export async function createConversation(data: InsertConversation) {
   const db = await getDb();
   if (!db) throw new Error("Database not available");
-  await db.execute(sql`
+  const result = await db.execute(sql`
     INSERT INTO conversations (userId, agentType, title)
     VALUES (${data.userId}, ${data.agentType}, ${data.title || null})
   `);
-  const result = await db.execute(sql`SELECT LAST_INSERT_ID() as insertId`);
-  return { insertId: ((result[0] as any[])[0])?.insertId };
+  return { insertId: (result[0] as any).insertId };
 }
 
 export async function getConversation(id: number) {
@@ -589,15 +792,18 @@ export async function deleteConversation(id: number) {
 export async function createMessage(data: InsertMessage) {
   const db = await getDb();
   if (!db) throw new Error("Database not available");
-  await db.execute(sql`
+  const result = await db.execute(sql`
     INSERT INTO messages (conversationId, role, content, toolCalls, toolResults)
     VALUES (${data.conversationId}, ${data.role}, ${data.content}, ${data.toolCalls || null}, ${data.toolResults || null})
   `);
   
-  await db.execute(sql`UPDATE conversations SET updatedAt = NOW() WHERE id = ${data.conversationId}`);
+  // Keskustelun järjestysaikaleima päivitetään taustalla - viesti on jo tallessa, eikä
+  // vastauksen tarvitse odottaa toista round tripiä
+  db.execute(sql`UPDATE conversations SET updatedAt = NOW() WHERE id = ${data.conversationId}`)
+    .catch(error => console.error("[Database] Failed to touch conversation updatedAt:", error));
   
-  const result = await db.execute(sql`SELECT LAST_INSERT_ID() as insertId`);
-  return { insertId: ((result[0] as any[])[0])?.insertId };
+  // insertId tulee suoraan INSERTin result headerista - ei erillistä LAST_INSERT_ID()-kyselyä
+  return { insertId: (result[0] as any).insertId };
 }
 
 export async function getMessagesByConversationId(conversationId: number, limit: number = 100) {
@@ -615,14 +821,19 @@ export async function getStats() {
   const db = await getDb();
   if (!db) return { companies: 0, events: 0, jobs: 0 };
 
-  const companyResult = await db.execute(sql`SELECT COUNT(*) as count FROM companies`);
-  const eventResult = await db.execute(sql`SELECT COUNT(*) as count FROM events`);
-  const jobResult = await db.execute(sql`SELECT COUNT(*) as count FROM jobs`);
+  // Kaikki laskurit yhdellä kyselyllä (yksi round trip kolmen sijaan)
+  const result = await db.execute(sql`
+    SELECT
+      (SELECT COUNT(*) FROM companies) as companies,
+      (SELECT COUNT(*) FROM events) as events,
+      (SELECT COUNT(*) FROM jobs) as jobs
+  `);
+  const row = ((result[0] as any[]) || [])[0];
 
   return {
-    companies: ((companyResult[0] as any[])[0])?.count || 0,
-    events: ((eventResult[0] as any[])[0])?.count || 0,
-    jobs: ((jobResult[0] as any[])[0])?.count || 0,
+    companies: row?.companies || 0,
+    events: row?.events || 0,
+    jobs: row?.jobs || 0,
   };
 }
 
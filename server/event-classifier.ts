@@ -1,7 +1,8 @@
 /**
  * Event Classifier - LLM-pohjainen uutisten luokittelu
  */
-import OpenAI from "openai";
+import { getOpenAIClient } from "./_core/ai-clients";
+import { ENV } from "./_core/env";
 import type { RawNewsItem } from "./news-fetcher";
 import type { EventType } from "../drizzle/schema";
 
@@ -64,15 +65,14 @@ VASTAA VAIN JSON-MUODOSSA:
  * Luokittele uutinen OpenAI:lla
  */
 export async function classifyNews(newsItem: RawNewsItem): Promise<ClassifiedEvent | null> {
-  const apiKey = process.env.OPENAI_API_KEY;
-  
-  if (!apiKey) {
+  if (!ENV.openaiApiKey) {
     console.warn("[EventClassifier] OPENAI_API_KEY not set - using rule-based fallback");
     return ruleBasedClassify(newsItem);
   }
 
   try {
-    const openai = new OpenAI({ apiKey });
+    // Jaettu client: classifyNews kutsutaan uutinen kerrallaan silmukassa
+    const openai = await getOpenAIClient();
     
     const prompt = CLASSIFICATION_PROMPT
       .replace("{headline}", newsItem.headline)
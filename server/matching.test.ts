@@ -0,0 +1,141 @@
+import { describe, expect, it } from "vitest";
+import type { Job, Profile } from "../drizzle/schema";
+import { calculateMatch } from "./matching";
+
+const emptyProfile = {
+  currentTitle: null,
+  yearsOfExperience: null,
+  skills: null,
+  preferredJobTitles: null,
+  preferredLocations: null,
+  preferredIndustries: null,
+  salaryMin: null,
+  salaryMax: null,
+  remotePreference: null,
+};
+
+const emptyJob = {
+  title: "",
+  company: null,
+  location: null,
+  description: null,
+  requiredSkills: null,
+  experienceRequired: null,
+  salaryMin: null,
+  salaryMax: null,
+  industry: null,
+  remoteType: null,
+};
+
+function profile(overrides: Record<string, unknown> = {}): Profile {
+  return { ...emptyProfile, ...overrides } as unknown as Profile;
+}
+
+function job(overrides: Record<string, unknown> = {}): Job {
+  return { ...emptyJob, ...overrides } as unknown as Job;
+}
+
+describe("calculateMatch", () => {
+  it("gives neutral scores when profile and job are empty", () => {
+    const result = calculateMatch(profile(), job());
+    expect(result).toMatchObject({
+      totalScore: 60,
+      titleScore: 60,
+      skillScore: 55,
+      experienceScore: 65,
+      locationScore: 60,
+      salaryScore: 65,
+      industryScore: 60,
+      companyScore: 65,
+      matchCategory: "fair",
+    });
+    expect(result.reasons).toEqual([]);
+  });
+
+  it("scores a title synonym hit (myyntipäällikkö ~ sales) at 85", () => {
+    const result = calculateMatch(
+      profile({ preferredJobTitles: '["Myyntipäällikkö"]' }),
+      job({ title: "Sales Representative" })
+    );
+    expect(result.titleScore).toBe(85);
+    expect(result.totalScore).toBe(67);
+    expect(result.reasons).toContain("Työtehtävä vastaa hakemaasi roolia");
+  });
+
+  it("treats Espoo as a Helsinki-area match", () => {
+    const result = calculateMatch(
+      profile({ preferredLocations: '["Helsinki"]' }),
+      job({ title: "Analyst", location: "Espoo" })
+    );
+    expect(result.locationScore).toBe(95);
+    expect(result.totalScore).toBe(66);
+  });
+
+  it("matches any major Finnish city when the user wants 'Suomi'", () => {
+    const result = calculateMatch(
+      profile({ preferredLocations: '["Suomi"]' }),
+      job({ title: "Analyst", location: "Oulu" })
+    );
+    expect(result.locationScore).toBe(80);
+    expect(result.totalScore).toBe(63);
+  });
+
+  it("combines all scorers for a filled-in profile", () => {
+    const result = calculateMatch(
+      profile({
+        currentTitle: "Markkinointipäällikkö",
+        yearsOfExperience: 6,
+        skills: '["SEO","Google Analytics","HubSpot"]',
+        preferredJobTitles: '["Marketing Manager"]',
+        preferredLocations: '["Helsinki"]',
+        preferredIndustries: '["SaaS"]',
+        salaryMin: 4000,
+        salaryMax: 5500,
+        remotePreference: "hybrid",
+      }),
+      job({
+        title: "Head of Growth Marketing",
+        company: "Acme",
+        location: "Espoo",
+        description: "SEO and content",
+        experienceRequired: 5,
+        salaryMin: 5000,
+        salaryMax: 6000,
+        industry: "SaaS software",
+        remoteType: "on-site",
+      })
+    );
+    expect(result).toMatchObject({
+      totalScore: 72,
+      titleScore: 75,
+      skillScore: 50,
+      experienceScore: 100,
+      locationScore: 95,
+      salaryScore: 33,
+      industryScore: 100,
+      companyScore: 65,
+      matchCategory: "good",
+    });
+  });
+
+  it("returns the same result when the same profile object is reused", () => {
+    const p = profile({
+      skills: '["React","Node"]',
+      preferredJobTitles: '["Developer"]',
+      preferredLocations: '["Tampere"]',
+    });
+    const j = job({ title: "Senior Developer", location: "Tampere", requiredSkills: '["React","Node"]' });
+
+    const first = calculateMatch(p, j);
+    const second = calculateMatch(p, j);
+    expect(second).toEqual(first);
+  });
+
+  it("does not reuse derived data across different profile objects", () => {
+    const j = job({ title: "Analyst", location: "Espoo" });
+    const helsinki = calculateMatch(profile({ preferredLocations: '["Helsinki"]' }), j);
+    const tampere = calculateMatch(profile({ preferredLocations: '["Tampere"]' }), j);
+    expect(helsinki.locationScore).toBe(95);
+    expect(tampere.locationScore).toBe(40);
+  });
+});
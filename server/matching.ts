@@ -10,6 +10,9 @@ import type { Profile, Job } from "../drizzle/schema";
  */
 function safeParseArray(jsonString: string | null | undefined, fieldName?: string): string[] {
   if (!jsonString) return [];
+  // Nopea polku: arvo joka ei ala '['-merkillä ei voi olla taulukko - ohitetaan JSON.parse ja poikkeus.
+  // Hiljainen kuten ennenkin valideille ei-taulukoille ("null", "{}"); varoitus vain jäsennysvirheestä
+  if (jsonString.trimStart().charCodeAt(0) !== 91 /* [ */) return [];
   try {
     const parsed = JSON.parse(jsonString);
     return Array.isArray(parsed) ? parsed : [];
@@ -21,6 +24,46 @@ function safeParseArray(jsonString: string | null | undefined, fieldName?: strin
   }
 }
 
+// Staattiset hakutaulut - määritellään kerran moduulitasolla eikä joka kutsulla uudelleen
+const TITLE_SYNONYM_GROUPS: readonly (readonly string[])[] = Object.freeze([
+  ["markkinointi", "marketing", "markkinoija", "marketer", "markkinointipäällikkö"],
+  ["myynti", "sales", "myyjä", "salesperson", "myyntipäällikkö"],
+  ["johtaja", "manager", "director", "head", "lead", "päällikkö", "esimies"],
+  ["kehittäjä", "developer", "ohjelmoija", "programmer", "coder", "devaaja"],
+  ["suunnittelija", "designer", "ux", "ui", "muotoilija"],
+  ["analyytikko", "analyst", "data", "analytiikka"],
+  ["konsultti", "consultant", "advisor", "neuvonantaja"],
+  ["toimitusjohtaja", "ceo", "chief executive"],
+  ["cmo", "chief marketing", "markkinointijohtaja"],
+  ["cto", "chief technology", "teknologiajohtaja"],
+  ["coo", "chief operating", "operatiivinen johtaja"],
+  ["hr", "henkilöstö", "rekrytointi", "recruitment", "talent"],
+  ["asiakaspalvelu", "customer service", "asiakaspalvelija", "support"],
+  ["projekti", "project", "projektipäällikkö", "project manager"],
+]);
+
+const COMMON_SKILLS: readonly string[] = Object.freeze([
+  // Tech
+  "javascript", "typescript", "python", "java", "react", "node", "sql", "aws",
+  "azure", "google cloud", "docker", "kubernetes", "git", "ci/cd",
+  // Marketing
+  "excel", "powerpoint", "crm", "salesforce", "hubspot", "google analytics",
+  "seo", "sem", "facebook ads", "google ads", "linkedin", "markkinointi",
+  "some", "sosiaalinen media", "content", "sisältö", "brändi", "brand",
+  // Sales
+  "myynti", "sales", "b2b", "b2c", "neuvottelu", "asiakashankinta",
+  // General
+  "viestintä", "projektinhallinta", "johtaminen", "tiimityö", "kommunikointi",
+  "englanti", "suomi", "ruotsi", "saksa",
+  // Business
+  "saas", "startup", "enterprise", "e-commerce", "verkkokauppa",
+  "budjetointi", "raportointi", "analytiikka",
+]);
+
+const HELSINKI_ALIASES: readonly string[] = Object.freeze(["helsinki", "espoo", "vantaa", "pääkaupunkiseutu", "hki", "pk-seutu", "uusimaa"]);
+
+const MAJOR_CITIES: readonly string[] = Object.freeze(["tampere", "turku", "oulu", "jyväskylä", "lahti", "kuopio"]);
+
 export interface MatchScores {
   totalScore: number;
   skillScore: number;
@@ -35,17 +78,69 @@ export interface MatchScores {
   reasons?: string[];
 }
 
+/**
+ * Profiilista johdetut, työpaikasta riippumattomat tiedot. Scout-ajo matchaa saman profiilin
+ * kymmeniä työpaikkoja vasten, joten JSON-kentät parsitaan ja normalisoidaan vain kerran per profiili.
+ */
+interface ProfileMatchData {
+  normalizedTitles: string[];
+  titleWords: string[];
+  wantedSynonymGroups: readonly (readonly string[])[];
+  normalizedSkills: string[];
+  normalizedLocations: string[];
+  wantsHelsinki: boolean;
+  wantsFinland: boolean;
+  normalizedIndustries: string[];
+}
+
+const profileMatchDataCache = new WeakMap<Profile, ProfileMatchData>();
+
+function getProfileMatchData(profile: Profile): ProfileMatchData {
+  const cached = profileMatchDataCache.get(profile);
+  if (cached) return cached;
+
+  // Tarkista preferredJobTitles/desiredTitles
+  const preferredTitles: string[] = safeParseArray(
+    (profile as any).desiredTitles || (profile as any).preferredJobTitles,
+    'preferredJobTitles'
+  );
+  // Myös currentTitle voi olla relevantti
+  if (profile.currentTitle) {
+    preferredTitles.push(profile.currentTitle);
+  }
+  const normalizedTitles = preferredTitles.map(t => t.toLowerCase().trim());
+  const normalizedLocations = safeParseArray(profile.preferredLocations, 'profile.preferredLocations')
+    .map(l => l.toLowerCase().trim());
+
+  const data: ProfileMatchData = {
+    normalizedTitles,
+    titleWords: normalizedTitles.flatMap(t => t.split(/[\s\-,]+/).filter(w => w.length > 2)),
+    wantedSynonymGroups: TITLE_SYNONYM_GROUPS.filter(group =>
+      group.some(syn => normalizedTitles.some(t => t.includes(syn)))
+    ),
+    normalizedSkills: safeParseArray(profile.skills, 'profile.skills').map(s => s.toLowerCase().trim()),
+    normalizedLocations,
+    wantsHelsinki: normalizedLocations.some(loc => HELSINKI_ALIASES.some(a => loc.includes(a))),
+    wantsFinland: normalizedLocations.some(loc => loc.includes("suomi") || loc.includes("finland")),
+    normalizedIndustries: safeParseArray(profile.preferredIndustries, 'profile.preferredIndustries')
+      .map(i => i.toLowerCase().trim()),
+  };
+  profileMatchDataCache.set(profile, data);
+  return data;
+}
+
 /**
  * Laskee matchaus-scoren profiilin ja työpaikan välillä
  */
 export function calculateMatch(profile: Profile, job: Job): MatchScores {
-  const skillScore = calculateSkillMatch(profile, job);
+  const profileData = getProfileMatchData(profile);
+  const skillScore = calculateSkillMatch(profileData, job);
   const experienceScore = calculateExperienceMatch(profile, job);
-  const locationScore = calculateLocationMatch(profile, job);
+  const locationScore = calculateLocationMatch(profile, profileData, job);
   const salaryScore = calculateSalaryMatch(profile, job);
-  const industryScore = calculateIndustryMatch(profile, job);
+  const industryScore = calculateIndustryMatch(profileData, job);
   const companyScore = calculateCompanyMatch(job);
-  const titleScore = calculateTitleMatch(profile, job);
+  const titleScore = calculateTitleMatch(profileData, job);
 
   // Painotettu kokonaisscore - title on tärkeä!
   const totalScore = Math.round(
@@ -79,24 +174,12 @@ export function calculateMatch(profile: Profile, job: Job): MatchScores {
 /**
  * Title-matchaus (25%) - tarkistaa vastaako työpaikan otsikko käyttäjän hakemia titlejä
  */
-function calculateTitleMatch(profile: Profile, job: Job): number {
+function calculateTitleMatch(profileData: ProfileMatchData, job: Job): number {
   const jobTitle = (job.title || "").toLowerCase();
-  
-  // Tarkista preferredJobTitles/desiredTitles
-  let preferredTitles: string[] = safeParseArray(
-    (profile as any).desiredTitles || (profile as any).preferredJobTitles,
-    'preferredJobTitles'
-  );
-
-  // Myös currentTitle voi olla relevantti
-  if (profile.currentTitle) {
-    preferredTitles.push(profile.currentTitle);
-  }
+  const { normalizedTitles, titleWords } = profileData;
 
-  if (preferredTitles.length === 0) return 60; // Neutraali
+  if (normalizedTitles.length === 0) return 60; // Neutraali
 
-  const normalizedTitles = preferredTitles.map(t => t.toLowerCase().trim());
-  
   // Tarkista suora osuma
   for (const title of normalizedTitles) {
     if (jobTitle.includes(title) || title.includes(jobTitle)) {
@@ -106,7 +189,6 @@ function calculateTitleMatch(profile: Profile, job: Job): number {
 
   // Tarkista osittaiset osumat (sanat)
   const jobWords = jobTitle.split(/[\s\-,]+/).filter(w => w.length > 2);
-  const titleWords = normalizedTitles.flatMap(t => t.split(/[\s\-,]+/).filter(w => w.length > 2));
   
   const matchedWords = jobWords.filter(word => 
     titleWords.some(tw => tw.includes(word) || word.includes(tw))
@@ -117,27 +199,8 @@ function calculateTitleMatch(profile: Profile, job: Job): number {
   }
 
   // Tarkista yleisiä synonyymejä
-  const synonymGroups = [
-    ["markkinointi", "marketing", "markkinoija", "marketer", "markkinointipäällikkö"],
-    ["myynti", "sales", "myyjä", "salesperson", "myyntipäällikkö"],
-    ["johtaja", "manager", "director", "head", "lead", "päällikkö", "esimies"],
-    ["kehittäjä", "developer", "ohjelmoija", "programmer", "coder", "devaaja"],
-    ["suunnittelija", "designer", "ux", "ui", "muotoilija"],
-    ["analyytikko", "analyst", "data", "analytiikka"],
-    ["konsultti", "consultant", "advisor", "neuvonantaja"],
-    ["toimitusjohtaja", "ceo", "chief executive"],
-    ["cmo", "chief marketing", "markkinointijohtaja"],
-    ["cto", "chief technology", "teknologiajohtaja"],
-    ["coo", "chief operating", "operatiivinen johtaja"],
-    ["hr", "henkilöstö", "rekrytointi", "recruitment", "talent"],
-    ["asiakaspalvelu", "customer service", "asiakaspalvelija", "support"],
-    ["projekti", "project", "projektipäällikkö", "project manager"],
-  ];
-
-  for (const group of synonymGroups) {
-    const jobHas = group.some(syn => jobTitle.includes(syn));
-    const userWants = group.some(syn => normalizedTitles.some(t => t.includes(syn)));
-    if (jobHas && userWants) {
+  for (const group of profileData.wantedSynonymGroups) {
+    if (group.some(syn => jobTitle.includes(syn))) {
       return 85;
     }
   }
@@ -148,8 +211,8 @@ function calculateTitleMatch(profile: Profile, job: Job): number {
 /**
  * Taidot-matchaus (25%)
  */
-function calculateSkillMatch(profile: Profile, job: Job): number {
-  const userSkills = safeParseArray(profile.skills, 'profile.skills');
+function calculateSkillMatch(profileData: ProfileMatchData, job: Job): number {
+  const normalizedUserSkills = profileData.normalizedSkills;
 
   // Jos työpaikalla on requiredSkills, käytä niitä
   let requiredSkills = safeParseArray(job.requiredSkills, 'job.requiredSkills');
@@ -161,11 +224,10 @@ function calculateSkillMatch(profile: Profile, job: Job): number {
   }
 
   // Jos ei taitodataa, anna neutraali score
-  if (userSkills.length === 0 || requiredSkills.length === 0) {
+  if (normalizedUserSkills.length === 0 || requiredSkills.length === 0) {
     return 55;
   }
 
-  const normalizedUserSkills = userSkills.map(s => s.toLowerCase().trim());
   const normalizedRequired = requiredSkills.map(s => s.toLowerCase().trim());
 
   const matchedSkills = normalizedRequired.filter(skill =>
@@ -185,25 +247,7 @@ function calculateSkillMatch(profile: Profile, job: Job): number {
  */
 function extractSkillsFromText(text: string): string[] {
   const lowerText = text.toLowerCase();
-  const commonSkills = [
-    // Tech
-    "javascript", "typescript", "python", "java", "react", "node", "sql", "aws",
-    "azure", "google cloud", "docker", "kubernetes", "git", "ci/cd",
-    // Marketing
-    "excel", "powerpoint", "crm", "salesforce", "hubspot", "google analytics",
-    "seo", "sem", "facebook ads", "google ads", "linkedin", "markkinointi",
-    "some", "sosiaalinen media", "content", "sisältö", "brändi", "brand",
-    // Sales
-    "myynti", "sales", "b2b", "b2c", "neuvottelu", "asiakashankinta",
-    // General
-    "viestintä", "projektinhallinta", "johtaminen", "tiimityö", "kommunikointi",
-    "englanti", "suomi", "ruotsi", "saksa",
-    // Business
-    "saas", "startup", "enterprise", "e-commerce", "verkkokauppa",
-    "budjetointi", "raportointi", "analytiikka",
-  ];
-  
-  return commonSkills.filter(skill => lowerText.includes(skill));
+  return COMMON_SKILLS.filter(skill => lowerText.includes(skill));
 }
 
 /**
@@ -232,28 +276,23 @@ function calculateExperienceMatch(profile: Profile, job: Job): number {
 /**
  * Sijainti-matchaus (15%)
  */
-function calculateLocationMatch(profile: Profile, job: Job): number {
+function calculateLocationMatch(profile: Profile, profileData: ProfileMatchData, job: Job): number {
   // Etätyö-preferenssi
   if (profile.remotePreference === "remote" && job.remoteType === "remote") return 100;
   if (profile.remotePreference === "hybrid" && (job.remoteType === "hybrid" || job.remoteType === "remote")) return 90;
   if (profile.remotePreference === "on-site" && job.remoteType === "on-site") return 100;
 
   // Maantieteellinen sijainti
-  const preferredLocs = safeParseArray(profile.preferredLocations, 'profile.preferredLocations');
+  const normalizedPreferred = profileData.normalizedLocations;
 
-  if (preferredLocs.length === 0 || !job.location) return 60;
+  if (normalizedPreferred.length === 0 || !job.location) return 60;
 
-  const normalizedPreferred = preferredLocs.map(l => l.toLowerCase().trim());
   const jobLocation = job.location.toLowerCase().trim();
 
   // Helsinki-alue on yleinen
-  const helsinkiAliases = ["helsinki", "espoo", "vantaa", "pääkaupunkiseutu", "hki", "pk-seutu", "uusimaa"];
-  const jobInHelsinki = helsinkiAliases.some(a => jobLocation.includes(a));
-  const userWantsHelsinki = normalizedPreferred.some(loc => 
-    helsinkiAliases.some(a => loc.includes(a))
-  );
+  const jobInHelsinki = HELSINKI_ALIASES.some(a => jobLocation.includes(a));
 
-  if (jobInHelsinki && userWantsHelsinki) return 95;
+  if (jobInHelsinki && profileData.wantsHelsinki) return 95;
 
   // Muut kaupungit
   const isMatch = normalizedPreferred.some(loc => 
@@ -261,10 +300,10 @@ function calculateLocationMatch(profile: Profile, job: Job): number {
   );
 
   // "Suomi" tai "Finland" matchi
-  if (normalizedPreferred.some(loc => loc.includes("suomi") || loc.includes("finland"))) {
+  if (profileData.wantsFinland) {
     if (jobLocation.includes("finland") || jobLocation.includes("suomi") || 
-        helsinkiAliases.some(a => jobLocation.includes(a)) ||
-        ["tampere", "turku", "oulu", "jyväskylä", "lahti", "kuopio"].some(c => jobLocation.includes(c))) {
+        jobInHelsinki ||
+        MAJOR_CITIES.some(c => jobLocation.includes(c))) {
       return 80;
     }
   }
@@ -303,12 +342,11 @@ function calculateSalaryMatch(profile: Profile, job: Job): number {
 /**
  * Ala-matchaus (5%)
  */
-function calculateIndustryMatch(profile: Profile, job: Job): number {
-  const preferredIndustries = safeParseArray(profile.preferredIndustries, 'profile.preferredIndustries');
+function calculateIndustryMatch(profileData: ProfileMatchData, job: Job): number {
+  const normalizedPreferred = profileData.normalizedIndustries;
 
-  if (preferredIndustries.length === 0 || !job.industry) return 60;
+  if (normalizedPreferred.length === 0 || !job.industry) return 60;
 
-  const normalizedPreferred = preferredIndustries.map(i => i.toLowerCase().trim());
   const jobIndustry = job.industry.toLowerCase().trim();
 
   const isMatch = normalizedPreferred.some(industry => 
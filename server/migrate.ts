@@ -3,8 +3,8 @@
  * Creates ALL tables on startup
  */
 
-import { drizzle } from "drizzle-orm/mysql2";
 import { sql } from "drizzle-orm";
+import { getDb } from "./db";
 
 export async function runMigrations() {
   if (!process.env.DATABASE_URL) {
@@ -12,7 +12,12 @@ export async function runMigrations() {
     return;
   }
 
-  const db = drizzle(process.env.DATABASE_URL);
+  // Käytetään sovelluksen jaettua poolia, ettei migraatio jätä omaa yhteyspooliaan auki
+  const db = await getDb();
+  if (!db) {
+    console.error("[Migrate] Database not available, skipping migrations");
+    return;
+  }
   console.log("[Migrate] Running migrations...");
 
   try {
@@ -389,8 +394,111 @@ export async function runMigrations() {
       console.log("[Migrate] ✓ profiles.targetFunctions added");
     } catch (e: any) { }
 
+    // upsertProfile (ON DUPLICATE KEY UPDATE) ja createMatches (INSERT IGNORE) luottavat näihin
+    // uniikkiavaimiin; drizzle-kit-migraatiot eivät niitä luoneet
+    await ensureUniqueKey(db, "profiles", "idx_profiles_userId", ["userId"]);
+    await ensureUniqueKey(db, "matches", "unique_user_job", ["userId", "jobId"]);
+
+    // ============== COMPOSITE INDEXES (hot per-user ORDER BY queries) ==============
+    try {
+      await db.execute(sql`ALTER TABLE matches ADD INDEX idx_matches_user_score (userId, totalScore DESC)`);
+      console.log("[Migrate] ✓ matches(userId, totalScore) index added");
+    } catch (e: any) { }
+
+    try {
+      await db.execute(sql`ALTER TABLE savedJobs ADD INDEX idx_savedJobs_user_savedAt (userId, savedAt DESC)`);
+      console.log("[Migrate] ✓ savedJobs(userId, savedAt) index added");
+    } catch (e: any) { }
+
+    try {
+      await db.execute(sql`ALTER TABLE conversations ADD INDEX idx_conversations_user_updated (userId, updatedAt DESC)`);
+      console.log("[Migrate] ✓ conversations(userId, updatedAt) index added");
+    } catch (e: any) { }
+
+    try {
+      await db.execute(sql`ALTER TABLE messages ADD INDEX idx_messages_conversation_created (conversationId, createdAt)`);
+      console.log("[Migrate] ✓ messages(conversationId, createdAt) index added");
+    } catch (e: any) { }
+
+    try {
+      await db.execute(sql`ALTER TABLE scoutHistory ADD INDEX idx_scoutHistory_user_executed (userId, executedAt DESC)`);
+      console.log("[Migrate] ✓ scoutHistory(userId, executedAt) index added");
+    } catch (e: any) { }
+
+    try {
+      await db.execute(sql`ALTER TABLE events ADD INDEX idx_events_company_created (companyId, createdAt DESC)`);
+      console.log("[Migrate] ✓ events(companyId, createdAt) index added");
+    } catch (e: any) { }
+
+    try {
+      await db.execute(sql`ALTER TABLE events ADD INDEX idx_events_createdAt (createdAt)`);
+      console.log("[Migrate] ✓ events(createdAt) index added");
+    } catch (e: any) { }
+
+    try {
+      await db.execute(sql`ALTER TABLE companyScores ADD INDEX idx_companyScores_user_combined (userId, combinedScore DESC)`);
+      console.log("[Migrate] ✓ companyScores(userId, combinedScore) index added");
+    } catch (e: any) { }
+
     console.log("[Migrate] ✓ All migrations complete!");
   } catch (error) {
     console.error("[Migrate] Migration error:", error);
   }
 }
+
+type MigrationDb = NonNullable<Awaited<ReturnType<typeof getDb>>>;
+
+/**
+ * Onko taulussa jo uniikki indeksi täsmälleen näille sarakkeille (nimestä riippumatta)
+ */
+async function hasUniqueIndex(db: MigrationDb, table: string, columns: string[]): Promise<boolean> {
+  const result = await db.execute(sql`
+    SELECT INDEX_NAME, GROUP_CONCAT(COLUMN_NAME ORDER BY SEQ_IN_INDEX) as cols
+    FROM information_schema.STATISTICS
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = ${table} AND NON_UNIQUE = 0
+    GROUP BY INDEX_NAME
+  `);
+  const wanted = columns.join(",");
+  return ((result[0] as any[]) || []).some((row: any) => row.cols === wanted);
+}
+
+/**
+ * Lisää uniikkiavaimen, jos vastaavaa ei vielä ole. Käynnistysmigraatio ei poista rivejä: jos
+ * taulussa on duplikaatteja, ne lasketaan ja lokitetaan virheenä ja avain jätetään lisäämättä,
+ * kunnes duplikaatit on yhdistetty käsin. Myös ALTERin epäonnistuminen lokitetaan virheenä.
+ */
+async function ensureUniqueKey(db: MigrationDb, table: string, indexName: string, columns: string[]) {
+  const columnDesc = `${table}(${columns.join(", ")})`;
+  try {
+    if (await hasUniqueIndex(db, table, columns)) return;
+
+    const columnList = sql.join(columns.map(c => sql.identifier(c)), sql`, `);
+    const duplicateResult = await db.execute(sql`
+      SELECT COUNT(*) as duplicateGroups, COALESCE(SUM(cnt - 1), 0) as extraRows FROM (
+        SELECT COUNT(*) as cnt FROM ${sql.identifier(table)}
+        GROUP BY ${columnList}
+        HAVING COUNT(*) > 1
+      ) d
+    `);
+    const duplicates = ((duplicateResult[0] as any[]) || [])[0] || {};
+    const groups = Number(duplicates.duplicateGroups) || 0;
+    if (groups > 0) {
+      console.error(
+        `[Migrate] ✗ NOT adding unique key ${indexName} on ${columnDesc}: ` +
+        `${groups} duplicate groups (${Number(duplicates.extraRows) || 0} extra rows). ` +
+        `Merge them manually (SELECT ${columns.join(", ")}, COUNT(*) FROM ${table} GROUP BY ${columns.join(", ")} HAVING COUNT(*) > 1) - ` +
+        `upserts on this table will insert duplicate rows until this is fixed`
+      );
+      return;
+    }
+
+    await db.execute(sql`ALTER TABLE ${sql.identifier(table)} ADD UNIQUE KEY ${sql.identifier(indexName)} (${columnList})`);
+    console.log(`[Migrate] ✓ ${columnDesc} unique key added`);
+  } catch (error) {
+    console.error(
+      `[Migrate] ✗ FAILED to ensure unique key ${indexName} on ${columnDesc} - ` +
+      `upserts on this table will insert duplicate rows until this is fixed:`,
+      error
+    );
+  }
+}
@@ -8,9 +8,15 @@
  */
 
 import { PrhCompanyData, savePrhData, getCompanyByName, createCompany, updateCompanyById } from "./db";
+import { TtlCache } from "./ttl-cache";
 
 const PRH_API_BASE_URL = "https://avoindata.prh.fi/opendata-ytj-api/v3";
 
+// Lyhytikäinen muistivälimuisti PRH-hauille (rekisteridata muuttuu harvoin)
+const PRH_CACHE_TTL_MS = 10 * 60 * 1000;
+const PRH_CACHE_MAX_ENTRIES = 500;
+const prhCache = new TtlCache<string, unknown>(PRH_CACHE_TTL_MS, PRH_CACHE_MAX_ENTRIES);
+
 // --- v3 API types ---
 
 interface PrhMultilangDesc {
@@ -119,6 +125,10 @@ export async function searchByYTunnus(yTunnus: string): Promise<PrhCompanyV3 | n
     // Clean Y-tunnus format (accept both 1234567-8 and 12345678)
     const cleanYTunnus = yTunnus.replace(/[^0-9-]/g, '');
 
+    const cacheKey = `ytunnus:${cleanYTunnus}`;
+    const cached = prhCache.get(cacheKey) as PrhCompanyV3 | null | undefined;
+    if (cached !== undefined) return cached;
+
     const url = `${PRH_API_BASE_URL}/companies?businessId=${encodeURIComponent(cleanYTunnus)}&maxResults=1`;
     console.log(`[PRH] Fetching company data for Y-tunnus: ${cleanYTunnus}`);
 
@@ -129,6 +139,7 @@ export async function searchByYTunnus(yTunnus: string): Promise<PrhCompanyV3 | n
     if (!response.ok) {
       if (response.status === 404) {
         console.log(`[PRH] No company found with Y-tunnus: ${cleanYTunnus}`);
+        prhCache.set(cacheKey, null);
         return null;
       }
       throw new Error(`PRH API error: ${response.status} ${response.statusText}`);
@@ -139,9 +150,11 @@ export async function searchByYTunnus(yTunnus: string): Promise<PrhCompanyV3 | n
     if (data.companies && data.companies.length > 0) {
       const company = data.companies[0];
       console.log(`[PRH] Found company: ${getActiveName(company.names)}`);
+      prhCache.set(cacheKey, company);
       return company;
     }
 
+    prhCache.set(cacheKey, null);
     return null;
   } catch (error) {
     console.error('[PRH] Error fetching company data:', error);
@@ -154,6 +167,10 @@ export async function searchByYTunnus(yTunnus: string): Promise<PrhCompanyV3 | n
  */
 export async function searchByCompanyName(name: string, maxResults: number = 10): Promise<PrhCompanyV3[]> {
   try {
+    const cacheKey = `name:${name.toLowerCase().trim()}:${maxResults}`;
+    const cached = prhCache.get(cacheKey) as PrhCompanyV3[] | undefined;
+    if (cached !== undefined) return cached;
+
     const encodedName = encodeURIComponent(name);
     const url = `${PRH_API_BASE_URL}/companies?name=${encodedName}&maxResults=${maxResults}&totalResults=true`;
     console.log(`[PRH] Searching companies with name: ${name}`);
@@ -165,6 +182,7 @@ export async function searchByCompanyName(name: string, maxResults: number = 10)
     // 404 means no results found - not an error
     if (response.status === 404) {
       console.log(`[PRH] No companies found with name: ${name}`);
+      prhCache.set(cacheKey, []);
       return [];
     }
 
@@ -176,7 +194,9 @@ export async function searchByCompanyName(name: string, maxResults: number = 10)
     const data = await response.json() as PrhSearchResponseV3;
     console.log(`[PRH] Found ${data.totalResults} companies matching "${name}"`);
 
-    return data.companies || [];
+    const companies = data.companies || [];
+    prhCache.set(cacheKey, companies);
+    return companies;
   } catch (error) {
     console.error('[PRH] Error searching companies:', error);
     throw error;
@@ -0,0 +1,76 @@
+import { afterEach, beforeEach, describe, expect, it, vi } from "vitest";
+import { TokenBucket } from "./rate-limiter";
+
+describe("TokenBucket", () => {
+  beforeEach(() => {
+    vi.useFakeTimers();
+    vi.setSystemTime(new Date("2026-01-01T00:00:00Z"));
+  });
+
+  afterEach(() => {
+    vi.useRealTimers();
+  });
+
+  it("resolves the first `capacity` acquires immediately", async () => {
+    const bucket = new TokenBucket(3, 2);
+    const resolved: number[] = [];
+
+    for (let i = 0; i < 3; i++) {
+      bucket.acquire().then(() => resolved.push(i));
+    }
+    await vi.advanceTimersByTimeAsync(0);
+
+    expect(resolved).toEqual([0, 1, 2]);
+  });
+
+  it("makes the next acquire wait about 1/refillPerSecond seconds", async () => {
+    const bucket = new TokenBucket(3, 2);
+    for (let i = 0; i < 3; i++) await bucket.acquire();
+
+    let resolved = false;
+    bucket.acquire().then(() => { resolved = true; });
+
+    await vi.advanceTimersByTimeAsync(499);
+    expect(resolved).toBe(false);
+
+    await vi.advanceTimersByTimeAsync(1);
+    expect(resolved).toBe(true);
+  });
+
+  it("serves waiters in arrival order", async () => {
+    const bucket = new TokenBucket(1, 1);
+    await bucket.acquire();
+
+    const order: string[] = [];
+    bucket.acquire().then(() => order.push("a"));
+    bucket.acquire().then(() => order.push("b"));
+    bucket.acquire().then(() => order.push("c"));
+
+    await vi.advanceTimersByTimeAsync(1000);
+    expect(order).toEqual(["a"]);
+
+    await vi.advanceTimersByTimeAsync(1000);
+    expect(order).toEqual(["a", "b"]);
+
+    await vi.advanceTimersByTimeAsync(1000);
+    expect(order).toEqual(["a", "b", "c"]);
+  });
+
+  it("does not let a new caller jump ahead of queued waiters", async () => {
+    const bucket = new TokenBucket(1, 1);
+    await bucket.acquire();
+
+    const order: string[] = [];
+    bucket.acquire().then(() => order.push("queued"));
+
+    // Tokeni ehtii kertyä, mutta jonossa odottava palvellaan ensin
+    await vi.advanceTimersByTimeAsync(999);
+    bucket.acquire().then(() => order.push("late"));
+
+    await vi.advanceTimersByTimeAsync(1);
+    expect(order).toEqual(["queued"]);
+
+    await vi.advanceTimersByTimeAsync(1000);
+    expect(order).toEqual(["queued", "late"]);
+  });
+});
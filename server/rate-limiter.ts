@@ -0,0 +1,61 @@
+/**
+ * Rate Limiter - token bucket ulkoisille API-kutsuille
+ *
+ * Tasoittaa purskeet (esim. agenttien rinnakkaiset Serper-haut) niin,
+ * ettei palveluntarjoajan rajoja ylitetä ja 429-virheitä synny.
+ */
+
+export class TokenBucket {
+  private tokens: number;
+  private lastRefill = Date.now();
+  private waiters: Array<() => void> = [];
+  private timer: ReturnType<typeof setTimeout> | null = null;
+
+  constructor(
+    private readonly capacity: number,
+    private readonly refillPerSecond: number
+  ) {
+    this.tokens = capacity;
+  }
+
+  /**
+   * Odottaa kunnes tokeni on saatavilla. Jonossa odottavat palvellaan saapumisjärjestyksessä.
+   */
+  acquire(): Promise<void> {
+    this.refill();
+    if (this.waiters.length === 0 && this.tokens >= 1) {
+      this.tokens -= 1;
+      return Promise.resolve();
+    }
+    return new Promise(resolve => {
+      this.waiters.push(resolve);
+      this.schedule();
+    });
+  }
+
+  private refill(): void {
+    const now = Date.now();
+    const elapsedSeconds = (now - this.lastRefill) / 1000;
+    if (elapsedSeconds > 0) {
+      this.tokens = Math.min(this.capacity, this.tokens + elapsedSeconds * this.refillPerSecond);
+      this.lastRefill = now;
+    }
+  }
+
+  private schedule(): void {
+    if (this.timer) return;
+    const waitMs = Math.max(0, Math.ceil(((1 - this.tokens) / this.refillPerSecond) * 1000));
+    this.timer = setTimeout(() => {
+      this.timer = null;
+      this.refill();
+      while (this.waiters.length > 0 && this.tokens >= 1) {
+        this.tokens -= 1;
+        this.waiters.shift()!();
+      }
+      if (this.waiters.length > 0) this.schedule();
+    }, waitMs);
+  }
+}
+
+// Serper.dev: jaettu rajoitin kaikille hakukutsuille (scout + agenttityökalut)
+export const serperLimiter = new TokenBucket(5, 5);
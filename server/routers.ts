@@ -2,8 +2,63 @@ import { COOKIE_NAME } from "@shared/const";
 import { getSessionCookieOptions } from "./_core/cookies";
 import { systemRouter } from "./_core/systemRouter";
 import { briefRouter } from "./brief-router";
+import { fetchSerper } from "./serper";
+import { getOpenAIClient } from "./_core/ai-clients";
 import { publicProcedure, protectedProcedure, router } from "./_core/trpc";
 import { z } from "zod";
+import type { InsertCompanyScore, InsertEvent, InsertMatch, Profile } from "../drizzle/schema";
+
+// Yrityspisteiden laskenta: montako yritystä käsitellään per kyselyerä
+const SCORE_BATCH_SIZE = 100;
+
+/**
+ * Laskee ja tallentaa käyttäjän yrityspisteet. Eventit, työpaikat ja pisteet käsitellään
+ * erissä: kolme kyselyä per erä, ei kolme per yritys. Palauttaa laskettujen pisteiden määrän.
+ */
+async function scoreCompaniesForUser(userId: number, companies: { id: number }[], profile: Profile | undefined) {
+  const { getEventsByCompanyIds, getJobsByCompanyIds, upsertCompanyScores } = await import("./db");
+  const { calculateTalentNeedScore, calculateProfileMatchScore, calculateCombinedScore } = await import("./company-scoring");
+
+  let scoresCalculated = 0;
+  for (let i = 0; i < companies.length; i += SCORE_BATCH_SIZE) {
+    const batch = companies.slice(i, i + SCORE_BATCH_SIZE);
+    const companyIds = batch.map(c => c.id);
+    const [eventsByCompany, jobsByCompany] = await Promise.all([
+      getEventsByCompanyIds(companyIds, 50),
+      getJobsByCompanyIds(companyIds, 100),
+    ]);
+
+    const scores: Omit<InsertCompanyScore, "userId">[] = [];
+    for (const company of batch) {
+      const events = eventsByCompany.get(company.id) || [];
+      const jobs = jobsByCompany.get(company.id) || [];
+
+      const { score: talentScore, reasons: talentReasons } = calculateTalentNeedScore(
+        company as any, events as any[], jobs as any[]
+      );
+      const { score: profileScore, reasons: profileReasons } = calculateProfileMatchScore(
+        company as any, events as any[], jobs as any[], profile as any
+      );
+      const combinedScore = calculateCombinedScore(talentScore, profileScore, !!profile);
+
+      scores.push({
+        companyId: company.id,
+        talentNeedScore: talentScore,
+        profileMatchScore: profileScore,
+        combinedScore,
+        scoreReasons: JSON.stringify([...talentReasons, ...profileReasons]),
+      });
+    }
+
+    await upsertCompanyScores(userId, scores);
+    scoresCalculated += scores.length;
+  }
+
+  const { invalidateUserContext } = await import("./agents/context");
+  invalidateUserContext(userId);
+
+  return scoresCalculated;
+}
 
 export const appRouter = router({
   system: systemRouter,
@@ -74,6 +129,8 @@ export const appRouter = router({
           workHistory: input.workHistory ? JSON.stringify(input.workHistory) : undefined,
           targetFunctions: input.targetFunctions ? JSON.stringify(input.targetFunctions) : undefined,
         });
+        const { invalidateUserContext } = await import("./agents/context");
+        invalidateUserContext(ctx.user.id);
         return { success: true };
       }),
 
@@ -112,8 +169,7 @@ export const appRouter = router({
         }
 
         // Step 2: structured extraction with OpenAI
-        const OpenAI = (await import("openai")).default;
-        const openai = new OpenAI({ apiKey: process.env.OPENAI_API_KEY });
+        const openai = await getOpenAIClient();
 
         let completion;
         try {
@@ -166,10 +222,12 @@ export const appRouter = router({
       .input(z.object({
         limit: z.number().optional().default(50),
         offset: z.number().optional().default(0),
+        // Keyset-sivutus: edellisen sivun viimeisen työpaikan id
+        beforeId: z.number().optional(),
       }))
       .query(async ({ input }) => {
         const { getJobs } = await import("./db");
-        return await getJobs(input.limit, input.offset);
+        return await getJobs(input.limit, input.offset, input.beforeId);
       }),
     getById: protectedProcedure
       .input(z.object({ id: z.number() }))
@@ -260,6 +318,8 @@ export const appRouter = router({
       .mutation(async ({ ctx, input }) => {
         const { saveJob } = await import("./db");
         await saveJob(ctx.user.id, input.jobId, input.notes);
+        const { invalidateUserContext } = await import("./agents/context");
+        invalidateUserContext(ctx.user.id);
         return { success: true };
       }),
     unsave: protectedProcedure
@@ -267,6 +327,8 @@ export const appRouter = router({
       .mutation(async ({ ctx, input }) => {
         const { unsaveJob } = await import("./db");
         await unsaveJob(ctx.user.id, input.jobId);
+        const { invalidateUserContext } = await import("./agents/context");
+        invalidateUserContext(ctx.user.id);
         return { success: true };
       }),
   }),
@@ -348,7 +410,7 @@ export const appRouter = router({
         maxResults: z.number().optional().default(50),
       }))
       .mutation(async ({ ctx, input }) => {
-        const { getProfileByUserId, createJob, createMatch, createScoutHistory, getOrCreateCompany, linkJobToCompany, checkMatchExists } = await import("./db");
+        const { getProfileByUserId, createJob, createMatches, getMatchedJobIds, createScoutHistory } = await import("./db");
         const { scoutJobs } = await import("./scout");
         const { calculateMatch } = await import("./matching");
 
@@ -364,7 +426,10 @@ export const appRouter = router({
         });
 
         let totalJobs = 0;
-        let newMatches = 0;
+        // jobId -> match; sama työpaikka voi tulla useasta lähteestä
+        const pendingMatches = new Map<number, InsertMatch>();
+        // Sama aikaleima kaikille tämän ajon työpaikoille - ei uutta Date-oliota per rivi
+        const scoutedAt = new Date();
 
         for (const result of results) {
           for (const job of result.jobs) {
@@ -391,15 +456,13 @@ export const appRouter = router({
               url: job.url ?? null,
               companyRating: job.companyRating ?? null,
               externalId: job.externalId ?? null,
-              createdAt: new Date(),
-              updatedAt: new Date(),
+              createdAt: scoutedAt,
+              updatedAt: scoutedAt,
             };
             const matchScores = calculateMatch(profile, jobForMatching);
 
-            const matchExists = await checkMatchExists(ctx.user.id, jobId);
-            
-            if (matchScores.totalScore >= 30 && !matchExists) {
-              await createMatch({
+            if (matchScores.totalScore >= 30 && !pendingMatches.has(jobId)) {
+              pendingMatches.set(jobId, {
                 userId: ctx.user.id,
                 jobId,
                 totalScore: matchScores.totalScore,
@@ -411,11 +474,21 @@ export const appRouter = router({
                 companyScore: matchScores.companyScore,
                 matchCategory: matchScores.matchCategory,
               });
-              newMatches++;
             }
           }
         }
 
+        // Olemassa olevat matchit suodatetaan pois yhdellä haulla (ei luoteta pelkkään
+        // unique_user_job-avaimeen), loput tallennetaan yhdellä monirivisellä INSERTillä
+        const alreadyMatched = await getMatchedJobIds(ctx.user.id, [...pendingMatches.keys()]);
+        const newMatches = await createMatches(
+          [...pendingMatches.values()].filter(m => !alreadyMatched.has(m.jobId))
+        );
+        if (newMatches > 0) {
+          const { invalidateUserContext } = await import("./agents/context");
+          invalidateUserContext(ctx.user.id);
+        }
+
         await createScoutHistory({
           userId: ctx.user.id,
           searchParams: JSON.stringify({ sources: input.sources, maxResults: input.maxResults }),
@@ -546,9 +619,11 @@ export const appRouter = router({
         secret: z.string(),
       }))
       .mutation(async ({ input }) => {
-        // Verify cron secret
-        const cronSecret = process.env.CRON_SECRET || "jobscout-cron-2024";
-        if (input.secret !== cronSecret) {
+        // Verify cron secret (vakioaikainen vertailu raakatavuilla)
+        const { timingSafeEqual } = await import("crypto");
+        const cronSecret = Buffer.from(process.env.CRON_SECRET || "jobscout-cron-2024", "utf8");
+        const provided = Buffer.from(input.secret, "utf8");
+        if (provided.length !== cronSecret.length || !timingSafeEqual(provided, cronSecret)) {
           throw new Error("Unauthorized");
         }
 
@@ -563,7 +638,7 @@ export const appRouter = router({
       .mutation(async ({ input }) => {
         const { fetchNews } = await import("./news-fetcher");
         const { classifyNewsBatch } = await import("./event-classifier");
-        const { getOrCreateCompany, createEvent } = await import("./db");
+        const { getOrCreateCompany, createEvents } = await import("./db");
 
         console.log("[CompanyScout] Fetching news...");
         const news = await fetchNews(input.daysBack);
@@ -572,10 +647,11 @@ export const appRouter = router({
         const classified = await classifyNewsBatch(news);
         console.log(`[CompanyScout] Classified ${classified.length} events`);
 
-        let eventsCreated = 0;
+        // Kerää eventit ja tallenna ne yhtenä eränä
+        const pendingEvents: InsertEvent[] = [];
         for (const event of classified) {
           const company = await getOrCreateCompany(event.companyName);
-          await createEvent({
+          pendingEvents.push({
             companyId: company.id,
             eventType: event.eventType as any,
             headline: event.headline,
@@ -587,8 +663,8 @@ export const appRouter = router({
             confidence: event.confidence,
             publishedAt: event.publishedAt,
           });
-          eventsCreated++;
         }
+        const eventsCreated = await createEvents(pendingEvents);
 
         return {
           success: true,
@@ -603,35 +679,12 @@ export const appRouter = router({
         daysBack: z.number().optional().default(30),
       }))
       .mutation(async ({ ctx, input }) => {
-        const { getActiveCompanies, getEventsByCompanyId, getJobsByCompanyId, upsertCompanyScore, getProfileByUserId } = await import("./db");
-        const { calculateTalentNeedScore, calculateProfileMatchScore, calculateCombinedScore } = await import("./company-scoring");
+        const { getActiveCompanies, getProfileByUserId } = await import("./db");
 
         const profile = await getProfileByUserId(ctx.user.id);
         const companies = await getActiveCompanies(input.daysBack);
 
-        let scoresCalculated = 0;
-        for (const company of companies) {
-          const events = await getEventsByCompanyId(company.id, 50);
-          const jobs = await getJobsByCompanyId(company.id, 100);
-
-          const { score: talentScore, reasons: talentReasons } = calculateTalentNeedScore(
-            company as any, events as any[], jobs as any[]
-          );
-          const { score: profileScore, reasons: profileReasons } = calculateProfileMatchScore(
-            company as any, events as any[], jobs as any[], profile as any
-          );
-          const combinedScore = calculateCombinedScore(talentScore, profileScore, !!profile);
-
-          await upsertCompanyScore({
-            companyId: company.id,
-            userId: ctx.user.id,
-            talentNeedScore: talentScore,
-            profileMatchScore: profileScore,
-            combinedScore,
-            scoreReasons: JSON.stringify([...talentReasons, ...profileReasons]),
-          });
-          scoresCalculated++;
-        }
+        const scoresCalculated = await scoreCompaniesForUser(ctx.user.id, companies, profile);
 
         return {
           success: true,
@@ -648,8 +701,7 @@ export const appRouter = router({
       .mutation(async ({ ctx, input }) => {
         const { fetchNews } = await import("./news-fetcher");
         const { classifyNewsBatch } = await import("./event-classifier");
-        const { getOrCreateCompany, createEvent, getActiveCompanies, getEventsByCompanyId, getJobsByCompanyId, upsertCompanyScore, getProfileByUserId } = await import("./db");
-        const { calculateTalentNeedScore, calculateProfileMatchScore, calculateCombinedScore } = await import("./company-scoring");
+        const { getOrCreateCompany, createEvents, getActiveCompanies, getProfileByUserId } = await import("./db");
 
         console.log("[CompanyScout] Starting full pipeline...");
 
@@ -659,10 +711,11 @@ export const appRouter = router({
         const classified = await classifyNewsBatch(news);
         console.log(`[CompanyScout] Classified ${classified.length} events`);
 
-        let eventsCreated = 0;
+        // Kerää eventit ja tallenna ne yhtenä eränä
+        const pendingEvents: InsertEvent[] = [];
         for (const event of classified) {
           const company = await getOrCreateCompany(event.companyName);
-          await createEvent({
+          pendingEvents.push({
             companyId: company.id,
             eventType: event.eventType as any,
             headline: event.headline,
@@ -674,35 +727,13 @@ export const appRouter = router({
             confidence: event.confidence,
             publishedAt: event.publishedAt,
           });
-          eventsCreated++;
         }
+        const eventsCreated = await createEvents(pendingEvents);
 
         const profile = await getProfileByUserId(ctx.user.id);
         const companies = await getActiveCompanies(input.scoreDaysBack);
 
-        let scoresCalculated = 0;
-        for (const company of companies) {
-          const events = await getEventsByCompanyId(company.id, 50);
-          const jobs = await getJobsByCompanyId(company.id, 100);
-
-          const { score: talentScore, reasons: talentReasons } = calculateTalentNeedScore(
-            company as any, events as any[], jobs as any[]
-          );
-          const { score: profileScore, reasons: profileReasons } = calculateProfileMatchScore(
-            company as any, events as any[], jobs as any[], profile as any
-          );
-          const combinedScore = calculateCombinedScore(talentScore, profileScore, !!profile);
-
-          await upsertCompanyScore({
-            companyId: company.id,
-            userId: ctx.user.id,
-            talentNeedScore: talentScore,
-            profileMatchScore: profileScore,
-            combinedScore,
-            scoreReasons: JSON.stringify([...talentReasons, ...profileReasons]),
-          });
-          scoresCalculated++;
-        }
+        const scoresCalculated = await scoreCompaniesForUser(ctx.user.id, companies, profile);
 
         console.log("[CompanyScout] Pipeline complete!");
 
@@ -818,18 +849,11 @@ export const appRouter = router({
           throw new Error("SERPER_API_KEY not configured");
         }
 
-        const response = await fetch("https://google.serper.dev/search", {
-          method: "POST",
-          headers: {
-            "X-API-KEY": SERPER_API_KEY,
-            "Content-Type": "application/json",
-          },
-          body: JSON.stringify({
-            q: input.query,
-            gl: "fi",
-            hl: "fi",
-            num: input.num,
-          }),
+        const response = await fetchSerper(SERPER_API_KEY, {
+          q: input.query,
+          gl: "fi",
+          hl: "fi",
+          num: input.num,
         });
 
         if (!response.ok) {
@@ -849,18 +873,11 @@ export const appRouter = router({
           throw new Error("SERPER_API_KEY not configured");
         }
 
-        const response = await fetch("https://google.serper.dev/search", {
-          method: "POST",
-          headers: {
-            "X-API-KEY": SERPER_API_KEY,
-            "Content-Type": "application/json",
-          },
-          body: JSON.stringify({
-            q: `${input.companyName} yritys suomi`,
-            gl: "fi",
-            hl: "fi",
-            num: 10,
-          }),
+        const response = await fetchSerper(SERPER_API_KEY, {
+          q: `${input.companyName} yritys suomi`,
+          gl: "fi",
+          hl: "fi",
+          num: 10,
         });
 
         if (!response.ok) {
@@ -885,18 +902,11 @@ export const appRouter = router({
 
         // Helper function for Serper searches
         const searchSerper = async (query: string, num: number = 10) => {
-          const response = await fetch("https://google.serper.dev/search", {
-            method: "POST",
-            headers: {
-              "X-API-KEY": SERPER_API_KEY,
-              "Content-Type": "application/json",
-            },
-            body: JSON.stringify({
-              q: query,
-              gl: "fi",
-              hl: "fi",
-              num,
-            }),
+          const response = await fetchSerper(SERPER_API_KEY, {
+            q: query,
+            gl: "fi",
+            hl: "fi",
+            num,
           });
           if (!response.ok) return null;
           return await response.json();
@@ -994,8 +1004,12 @@ export const appRouter = router({
         const hiringScore = calculateHiringScore(jobResults);
 
         // Determine overall sentiment
-        const positiveSignals = signals.filter(s => s.sentiment === "positive").length;
-        const negativeSignals = signals.filter(s => s.sentiment === "negative").length;
+        let positiveSignals = 0;
+        let negativeSignals = 0;
+        for (const s of signals) {
+          if (s.sentiment === "positive") positiveSignals++;
+          else if (s.sentiment === "negative") negativeSignals++;
+        }
         let overallSentiment: "positive" | "negative" | "neutral" = "neutral";
         if (positiveSignals > negativeSignals + 1) overallSentiment = "positive";
         if (negativeSignals > positiveSignals) overallSentiment = "negative";
@@ -1177,9 +1191,16 @@ export const appRouter = router({
       // Sort by match score (highest first)
       jobsWithScores.sort((a, b) => (b.matchScore || 0) - (a.matchScore || 0));
       
-      // Count excellent matches (85+)
-      const excellentMatches = jobsWithScores.filter(j => (j.matchScore || 0) >= 85).length;
-      const goodMatches = jobsWithScores.filter(j => (j.matchScore || 0) >= 70).length;
+      // Count excellent (85+) and good (70+) matches in one pass - list is sorted,
+      // so we can stop at the first score below 70
+      let excellentMatches = 0;
+      let goodMatches = 0;
+      for (const j of jobsWithScores) {
+        const score = j.matchScore || 0;
+        if (score < 70) break;
+        goodMatches++;
+        if (score >= 85) excellentMatches++;
+      }
       const bestScore = jobsWithScores.length > 0 ? jobsWithScores[0].matchScore || 0 : 0;
       
       if (allJobs.length > 0 && settings.emailEnabled && settings.emailAddress) {
@@ -1442,16 +1463,19 @@ export const appRouter = router({
       const db = await getDb();
       if (!db) return null;
       
-      const [eventsResult, companiesResult, recentResult] = await Promise.all([
-        db.execute(sql`SELECT COUNT(*) as total FROM events WHERE createdAt > DATE_SUB(NOW(), INTERVAL 7 DAY)`),
-        db.execute(sql`SELECT COUNT(*) as total FROM companies WHERE talentNeedScore > 0`),
-        db.execute(sql`SELECT COUNT(*) as total FROM events WHERE createdAt > DATE_SUB(NOW(), INTERVAL 24 HOUR)`),
-      ]);
+      // Kaikki laskurit yhdellä kyselyllä: yksi round trip ja yksi poolin yhteys kolmen sijaan
+      const result = await db.execute(sql`
+        SELECT
+          (SELECT COUNT(*) FROM events WHERE createdAt > DATE_SUB(NOW(), INTERVAL 7 DAY)) as eventsLast7Days,
+          (SELECT COUNT(*) FROM companies WHERE talentNeedScore > 0) as activeCompanies,
+          (SELECT COUNT(*) FROM events WHERE createdAt > DATE_SUB(NOW(), INTERVAL 24 HOUR)) as eventsLast24Hours
+      `);
+      const row = ((result[0] as any[]) || [])[0];
       
       return {
-        eventsLast7Days: (eventsResult[0] as any[])[0]?.total || 0,
-        activeCompanies: (companiesResult[0] as any[])[0]?.total || 0,
-        eventsLast24Hours: (recentResult[0] as any[])[0]?.total || 0,
+        eventsLast7Days: row?.eventsLast7Days || 0,
+        activeCompanies: row?.activeCompanies || 0,
+        eventsLast24Hours: row?.eventsLast24Hours || 0,
       };
     }),
 
@@ -1538,7 +1562,7 @@ export const appRouter = router({
           SELECT e.*, c.name as companyName
           FROM events e
           JOIN companies c ON e.companyId = c.id
-          WHERE e.companyId IN (${sql.raw(watchlistIds.join(',') || '0')})
+          WHERE e.companyId IN (${sql.join(watchlistIds.map((id: number) => sql`${id}`), sql`, `)})
           AND e.createdAt > DATE_SUB(NOW(), INTERVAL 7 DAY)
           ORDER BY e.createdAt DESC
           LIMIT 10
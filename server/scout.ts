@@ -1,4 +1,5 @@
 import type { Profile, InsertJob } from "../drizzle/schema";
+import { fetchSerper } from "./serper";
 
 /**
  * Scoutaus-agentti työpaikkojen hakuun
@@ -9,6 +10,9 @@ import type { Profile, InsertJob } from "../drizzle/schema";
  * https://serper.dev/
  */
 
+// Montako Serper-hakua ajetaan kerrallaan rinnakkain
+const SERPER_QUERY_CONCURRENCY = 3;
+
 export interface ScoutParams {
   profile: Profile;
   sources?: string[];
@@ -28,34 +32,36 @@ export async function scoutJobs(params: ScoutParams): Promise<ScoutResult[]> {
   const { profile, sources = ["serper"], maxResults = 50 } = params;
   const results: ScoutResult[] = [];
 
-  // 1. Serper.dev Search (ensisijainen - TOIMII!)
-  try {
-    const jobs = await scoutSerperJobs(profile, maxResults);
-    if (jobs.length > 0) {
-      results.push({
-        jobs,
-        source: "serper",
-        count: jobs.length,
-      });
-      console.log(`[Scout] Serper.dev found ${jobs.length} jobs`);
-    }
-  } catch (error) {
-    console.error("[Scout] Serper.dev error:", error);
+  // 1. Serper.dev Search (ensisijainen - TOIMII!) ja
+  // 2. Vantaan avoimet työpaikat (ilmainen avoin data API)
+  // Lähteet ovat toisistaan riippumattomia, joten haetaan ne rinnakkain
+  const [serperJobs, vantaaJobs] = await Promise.all([
+    scoutSerperJobs(profile, maxResults).catch((error) => {
+      console.error("[Scout] Serper.dev error:", error);
+      return [] as InsertJob[];
+    }),
+    scoutVantaaJobs(profile).catch((error) => {
+      console.error("[Scout] Vantaa API error:", error);
+      return [] as InsertJob[];
+    }),
+  ]);
+
+  if (serperJobs.length > 0) {
+    results.push({
+      jobs: serperJobs,
+      source: "serper",
+      count: serperJobs.length,
+    });
+    console.log(`[Scout] Serper.dev found ${serperJobs.length} jobs`);
   }
 
-  // 2. Vantaan avoimet työpaikat (ilmainen avoin data API)
-  try {
-    const jobs = await scoutVantaaJobs(profile);
-    if (jobs.length > 0) {
-      results.push({
-        jobs,
-        source: "vantaa",
-        count: jobs.length,
-      });
-      console.log(`[Scout] Vantaa API found ${jobs.length} jobs`);
-    }
-  } catch (error) {
-    console.error("[Scout] Vantaa API error:", error);
+  if (vantaaJobs.length > 0) {
+    results.push({
+      jobs: vantaaJobs,
+      source: "vantaa",
+      count: vantaaJobs.length,
+    });
+    console.log(`[Scout] Vantaa API found ${vantaaJobs.length} jobs`);
   }
 
   // 3. Adzuna (fallback jos Serper ei löydä mitään)
@@ -131,37 +137,19 @@ async function scoutSerperJobs(profile: Profile, maxResults: number): Promise<In
     `${searchTerm} avoimet työpaikat ${location} rekrytointi`,
   ];
 
-  for (const query of searchQueries) {
-    if (jobs.length >= maxResults) break;
-    
-    try {
-      console.log(`[Scout] Serper query: "${query}"`);
-      
-      const response = await fetch("https://google.serper.dev/search", {
-        method: "POST",
-        headers: {
-          "X-API-KEY": apiKey,
-          "Content-Type": "application/json",
-        },
-        body: JSON.stringify({
-          q: query,
-          gl: "fi",
-          hl: "fi",
-          num: 10,
-        }),
-      });
+  // Duplikaattitarkistus hajautusjoukoilla: O(1) per tulos koko listan läpikäynnin sijaan
+  const seenUrls = new Set<string | null | undefined>();
+  const seenTitleCompanies = new Set<string>();
 
-      if (!response.ok) {
-        const errorText = await response.text();
-        console.error(`[Scout] Serper error: ${response.status} - ${errorText}`);
-        continue;
-      }
+  // Haut ajetaan pienissä rinnakkaisissa erissä; tulokset käsitellään silti hakujärjestyksessä,
+  // ja seuraavaa erää ei aloiteta jos maxResults on jo täynnä
+  for (let i = 0; i < searchQueries.length; i += SERPER_QUERY_CONCURRENCY) {
+    if (jobs.length >= maxResults) break;
 
-      const data = await response.json();
-      const results = data.organic || [];
-      
-      console.log(`[Scout] Serper returned ${results.length} results for query`);
+    const batch = searchQueries.slice(i, i + SERPER_QUERY_CONCURRENCY);
+    const batchResults = await Promise.all(batch.map(query => fetchSerperResults(query, apiKey)));
 
+    for (const results of batchResults) {
       for (const result of results) {
         if (jobs.length >= maxResults) break;
         
@@ -169,17 +157,15 @@ async function scoutSerperJobs(profile: Profile, maxResults: number): Promise<In
         const job = parseSearchResultToJob(result, searchTerm, location);
         if (job) {
           // Tarkista ettei duplikaattia
-          const isDuplicate = jobs.some(j => 
-            j.url === job.url || 
-            (j.title === job.title && j.company === job.company)
-          );
+          const titleCompanyKey = `${job.title}\u0000${job.company ?? ""}`;
+          const isDuplicate = seenUrls.has(job.url) || seenTitleCompanies.has(titleCompanyKey);
           if (!isDuplicate) {
+            seenUrls.add(job.url);
+            seenTitleCompanies.add(titleCompanyKey);
             jobs.push(job);
           }
         }
       }
-    } catch (error) {
-      console.error(`[Scout] Serper fetch error for query "${query}":`, error);
     }
   }
 
@@ -187,6 +173,37 @@ async function scoutSerperJobs(profile: Profile, maxResults: number): Promise<In
   return jobs;
 }
 
+/**
+ * Yksittäinen Serper-haku - palauttaa orgaaniset tulokset tai tyhjän listan virheessä
+ */
+async function fetchSerperResults(query: string, apiKey: string): Promise<any[]> {
+  try {
+    console.log(`[Scout] Serper query: "${query}"`);
+    
+    const response = await fetchSerper(apiKey, {
+      q: query,
+      gl: "fi",
+      hl: "fi",
+      num: 10,
+    });
+
+    if (!response.ok) {
+      const errorText = await response.text();
+      console.error(`[Scout] Serper error: ${response.status} - ${errorText}`);
+      return [];
+    }
+
+    const data = await response.json();
+    const results = data.organic || [];
+    
+    console.log(`[Scout] Serper returned ${results.length} results for query`);
+    return results;
+  } catch (error) {
+    console.error(`[Scout] Serper fetch error for query "${query}":`, error);
+    return [];
+  }
+}
+
 /**
  * Parsii Google-hakutuloksen työpaikkatiedoksi
  */
@@ -0,0 +1,34 @@
+/**
+ * Serper.dev - ainoa reitti Google-hakuihin
+ *
+ * Kaikki Serper-kutsut kulkevat tämän funktion kautta, jotta jokainen pyyntö
+ * odottaa jaetun rajoittimen tokenin eikä yksikään kutsupaikka voi ohittaa sitä.
+ */
+
+import { serperLimiter } from "./rate-limiter";
+
+const SERPER_SEARCH_URL = "https://google.serper.dev/search";
+
+export interface SerperSearchParams {
+  q: string;
+  gl?: string;
+  hl?: string;
+  num?: number;
+  tbs?: string;
+}
+
+/**
+ * Tekee Serper-haun rajoittimen läpi. Palauttaa raa'an Responsen, jolloin
+ * kutsuja päättää itse virheiden käsittelystä kuten ennenkin.
+ */
+export async function fetchSerper(apiKey: string, params: SerperSearchParams): Promise<Response> {
+  await serperLimiter.acquire();
+  return fetch(SERPER_SEARCH_URL, {
+    method: "POST",
+    headers: {
+      "X-API-KEY": apiKey,
+      "Content-Type": "application/json",
+    },
+    body: JSON.stringify(params),
+  });
+}
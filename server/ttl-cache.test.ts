@@ -0,0 +1,60 @@
+import { afterEach, beforeEach, describe, expect, it, vi } from "vitest";
+import { TtlCache } from "./ttl-cache";
+
+describe("TtlCache", () => {
+  beforeEach(() => {
+    vi.useFakeTimers();
+    vi.setSystemTime(new Date("2026-01-01T00:00:00Z"));
+  });
+
+  afterEach(() => {
+    vi.useRealTimers();
+  });
+
+  it("returns a value until its TTL has passed", () => {
+    const cache = new TtlCache<string, number>(1000, 10);
+    cache.set("a", 1);
+
+    vi.advanceTimersByTime(999);
+    expect(cache.get("a")).toBe(1);
+
+    vi.advanceTimersByTime(1);
+    expect(cache.get("a")).toBeUndefined();
+    expect(cache.size).toBe(0);
+  });
+
+  it("evicts the oldest entry when full", () => {
+    const cache = new TtlCache<string, number>(1000, 2);
+    cache.set("a", 1);
+    cache.set("b", 2);
+    cache.set("c", 3);
+
+    expect(cache.get("a")).toBeUndefined();
+    expect(cache.get("b")).toBe(2);
+    expect(cache.get("c")).toBe(3);
+    expect(cache.size).toBe(2);
+  });
+
+  it("moves a re-set key to the back and renews its TTL", () => {
+    const cache = new TtlCache<string, number>(1000, 2);
+    cache.set("a", 1);
+    cache.set("b", 2);
+
+    vi.advanceTimersByTime(500);
+    cache.set("a", 10);
+    cache.set("c", 3);
+
+    expect(cache.get("b")).toBeUndefined();
+    expect(cache.get("a")).toBe(10);
+
+    vi.advanceTimersByTime(999);
+    expect(cache.get("a")).toBe(10);
+  });
+
+  it("deletes entries explicitly", () => {
+    const cache = new TtlCache<number, string>(1000, 10);
+    cache.set(1, "x");
+    cache.delete(1);
+    expect(cache.get(1)).toBeUndefined();
+  });
+});
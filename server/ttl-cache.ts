@@ -0,0 +1,43 @@
+/**
+ * TTL Cache - kooltaan rajattu muistivälimuisti vanhenevilla merkinnöillä
+ *
+ * Kun välimuisti on täynnä, vanhin merkintä poistetaan (Map säilyttää
+ * lisäysjärjestyksen). Vanhentunut merkintä poistetaan lukuhetkellä.
+ */
+
+export class TtlCache<K, V> {
+  private entries = new Map<K, { value: V; expiresAt: number }>();
+
+  constructor(
+    private readonly ttlMs: number,
+    private readonly maxEntries: number
+  ) {}
+
+  get(key: K): V | undefined {
+    const entry = this.entries.get(key);
+    if (!entry) return undefined;
+    if (entry.expiresAt <= Date.now()) {
+      this.entries.delete(key);
+      return undefined;
+    }
+    return entry.value;
+  }
+
+  set(key: K, value: V): void {
+    // Uudelleenasetus siirtää avaimen lisäysjärjestyksen loppuun
+    this.entries.delete(key);
+    if (this.entries.size >= this.maxEntries) {
+      const oldestKey = this.entries.keys().next().value;
+      if (oldestKey !== undefined) this.entries.delete(oldestKey);
+    }
+    this.entries.set(key, { value, expiresAt: Date.now() + this.ttlMs });
+  }
+
+  delete(key: K): void {
+    this.entries.delete(key);
+  }
+
+  get size(): number {
+    return this.entries.size;
+  }
+}
@@ -1,12 +1,22 @@
+// Intl.DateTimeFormat is costly to construct; keep one per locale.
+const briefDateFormatters = new Map<string, Intl.DateTimeFormat>();
+
+function getBriefDateFormatter(locale: string): Intl.DateTimeFormat {
+  let formatter = briefDateFormatters.get(locale);
+  if (!formatter) {
+    formatter = new Intl.DateTimeFormat(locale, {
+      weekday: "long",
+      day: "numeric",
+      month: "long",
+    });
+    briefDateFormatters.set(locale, formatter);
+  }
+  return formatter;
+}
+
 export function formatBriefDate(date: Date, language: string): string {
   const locale = language === "fi" ? "fi-FI" : "en-US";
-  return new Intl.DateTimeFormat(locale, {
-    weekday: "long",
-    day: "numeric",
-    month: "long",
-  })
-    .format(date)
-    .toUpperCase();
+  return getBriefDateFormatter(locale).format(date).toUpperCase();
 }
 
 export function issueNumber(createdAt: Date, now: Date = new Date()): number {